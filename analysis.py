@@ -0,0 +1,380 @@
+import base64
+import threading
+from collections import OrderedDict
+
+import fastjson
+from compact_block import CompactBlock, CompactTx, project_tx
+from fetcher import BlockFetcher
+from instrumentation import metrics
+
+msg_cache_size = 65536  # decoded msg lists kept by tx hash
+msg_cache = OrderedDict()
+msg_cache_lock = threading.Lock()
+
+
+def get_msg_list(tx: dict) -> list:
+    """
+    Takes a tx dict, decodes and returns the msg list. Decoded lists are memoized by tx hash,
+    a tx seen again (overlapping searches, reruns in the same process) isn't decoded twice
+    :param tx: tx dict
+    :return: decoded msg list, shared between calls so don't modify it
+    """
+    with msg_cache_lock:
+        decoded_msg_list = msg_cache.get(tx["hash"])
+    if decoded_msg_list is not None:
+        metrics.count("decode memo hit")
+        return decoded_msg_list
+
+    decoded_msg_list = []
+    msg_list = tx["events"][0]["sub"][0]["additional"]["execute_message"]
+
+    with metrics.timer("decode execute_message"):
+        for msg in msg_list:
+            decoded_msg = fastjson.loads(base64.b64decode(msg))
+            decoded_msg_list.append(decoded_msg)
+
+    with msg_cache_lock:
+        msg_cache[tx["hash"]] = decoded_msg_list
+        if len(msg_cache) > msg_cache_size:
+            msg_cache.popitem(last=False)  # drop the oldest
+
+    return decoded_msg_list
+
+
+def check_tx_type(tx: CompactTx, kind: str) -> bool:
+    """
+    :param tx: compact transaction
+    :param kind: string containing tx type
+    :return: boolean
+    """
+    if tx.kind == kind:
+        return True
+
+    return False
+
+
+def check_sender(tx: CompactTx, sender: str) -> bool:
+    """
+    :param tx: compact transaction
+    :param sender: string containing sender's address
+    :return: boolean
+    """
+    if tx.sender == sender:
+        return True
+
+    return False
+
+
+def get_sender(tx: CompactTx) -> str:
+    """
+    Returns the tx sender's address
+    :param tx: compact transaction
+    :return: str
+    """
+    return tx.sender
+
+
+def check_liq_tx(tx: CompactTx, liquidator: str) -> bool:
+    """
+    :param tx: compact transaction
+    :param liquidator: str containing liquidator's address
+    :return: true if tx is a liquidate_collateral from liquidator
+    """
+    if check_tx_type(tx, "execute_contract"):
+        if check_sender(tx, liquidator):  # find the liquidator's tx
+            if tx.liquidate:  # make sure its a liq tx
+                return True
+
+    return False
+
+
+def check_edge_block(block: CompactBlock, liquidator: str, end: bool = False) -> bool:
+    """
+    Walks block from the edge inwards over the liquidator's txs looking for the price_feed tx,
+    answered from the block's index in one lookup
+    :param block: compact block
+    :param liquidator: str containing liquidator's address
+    :param end: walk from the end of the block
+    :return: returns true if price_feed tx found right next to the liquidator's txs,
+             false in all other cases
+    """
+    return block.index.feed_at_edge(liquidator, end)
+
+
+def may_feed(height: int, fetcher: BlockFetcher) -> bool:
+    """
+    :param height: int of block
+    :param fetcher: block fetcher
+    :return: false only if the oracle index shows the block has no tx from the oracle feeder
+    """
+    if fetcher.oracle_index is None:
+        return True
+
+    return fetcher.oracle_index.may_feed(height)
+
+
+def needs_block(height: int, fetcher: BlockFetcher) -> bool:
+    """
+    A liquidation can only be backrun or frontrun if a price_feed tx is in its block
+    or a neighbouring block, otherwise check_block doesn't need to read any block
+    :param height: height of the liquidation block
+    :param fetcher: block fetcher
+    :return: false if neither the block nor its neighbours have a price_feed tx
+    """
+    return may_feed(height - 1, fetcher) or may_feed(height, fetcher) or may_feed(height + 1, fetcher)
+
+
+def check_prev_block_backrun(height: int, liquidator: str, fetcher: BlockFetcher) -> bool:
+    """
+    This method is called if the liquidation tx is the first tx on the block,
+    so we check the previous block in reverse order for the price_feed tx
+    :param height: height of the liquidation block
+    :param liquidator: str containing liquidator's address
+    :param fetcher: block fetcher
+    :return: returns true if price_feed tx found right before the liqiuidate tx,
+             false in all other cases
+    """
+    if not may_feed(height - 1, fetcher):
+        return False
+
+    block = fetcher.get_block(height - 1)
+
+    if block is None:
+        return False
+
+    return check_edge_block(block, liquidator, end=True)
+
+
+def check_next_block_frontrun(height: int, liquidator: str, fetcher: BlockFetcher) -> bool:
+    """
+    This method is called if the liquidation tx is the last tx on the block,
+    so we check the next block in order for the price_feed tx
+    :param height: height of the liquidation block
+    :param liquidator: str containing liquidator's address
+    :param fetcher: block fetcher
+    :return: returns true if price_feed tx found right after the liqiuidate tx,
+             false in all other cases
+    """
+    if not may_feed(height + 1, fetcher):
+        return False
+
+    block = fetcher.get_block(height + 1)
+
+    if block is None:
+        return False
+
+    return check_edge_block(block, liquidator)
+
+
+def check_block(height: int, liquidator: str, fetcher: BlockFetcher) -> tuple:
+    """
+    Looks up the liquidator's liq txs in the block's index and whether any of them sit right
+    next to a price_feed tx. If a liq tx is the first or last tx of the block, the previous
+    or next block is checked for the price_feed tx.
+
+    Given [some_tx, price_feed, liq_tx 1, ... liq_tx n], all liq_tx are considered backrun
+    Given [some_tx, price_feed, some_tx, liq_tx 1, ... liq_tx n], all liq_txs are considered not backrun
+    Given [some_tx, liq_tx 1, ... liq_tx n, price_feed], all liq_tx are considered frontrun
+    Given [some_tx, price_feed, liq_tx 1, ... liq_tx n], all liq_txs are considered not frontrun
+
+    :param height: height of the liquidation block
+    :param liquidator: str containing liquidator's address
+    :param fetcher: block fetcher
+    :return: tuple of backrun and frontrun booleans
+    """
+    if not needs_block(height, fetcher):
+        metrics.count("blocks skipped by oracle index")
+        return False, False
+
+    block = fetcher.get_block(height)
+    if not block:
+        return False, False
+
+    found = block.index.liquidators.get(liquidator)
+    if found is None:  # no liq tx from the liquidator
+        return False, False
+
+    first, last, backrun, frontrun = found  # backrun and frontrun of the liq txs inside the block
+
+    if first == 0:
+        backrun = check_prev_block_backrun(height, liquidator, fetcher) or backrun
+
+    if last == len(block) - 1:  # the liq tx at the end is checked last and decides frontrun on its own
+        frontrun = check_next_block_frontrun(height, liquidator, fetcher)
+
+    return backrun, frontrun
+
+
+def check_liquidations(liquidation_list: list, liquidator: str, fetcher: BlockFetcher) -> list:
+    """
+    This method checks if the liq txs from the liquidator backrun or frontrun the price_feed tx
+    from the oracle feeder, every liquidation block is checked once with check_block
+    :param liquidation_list: list of liquidate_collateral from liquidator
+    :param liquidator: str containing liquidator's address
+    :param fetcher: block fetcher
+    :return: liquidation list with backrun and frontrun information
+    """
+    checked = {}  # height -> (backrun, frontrun)
+
+    for liquidation in liquidation_list:
+        liq_height = liquidation["height"]
+
+        if liq_height not in checked:
+            with metrics.timer("check block"):
+                checked[liq_height] = check_block(liq_height, liquidator, fetcher)
+
+        liquidation["backrun"], liquidation["frontrun"] = checked[liq_height]
+
+    return liquidation_list
+
+
+def get_neighbour_heights(height: int, liquidator: str, fetcher: BlockFetcher) -> list:
+    """
+    :param height: height of the liquidation block
+    :param liquidator: str containing liquidator's address
+    :param fetcher: block fetcher
+    :return: list of the previous and next heights check_block will read for this block
+    """
+    neighbour_heights = []
+    if not needs_block(height, fetcher):
+        return neighbour_heights
+
+    block = fetcher.get_block(height)
+
+    found = block.index.liquidators.get(liquidator) if block else None
+
+    if found is not None:
+        first, last = found[:2]
+        if first == 0 and may_feed(height - 1, fetcher):  # check_prev_block_backrun reads it
+            neighbour_heights.append(height - 1)
+        if last == len(block) - 1 and may_feed(height + 1, fetcher):  # check_next_block_frontrun reads it
+            neighbour_heights.append(height + 1)
+
+    return neighbour_heights
+
+
+def load_blocks(height: int, liquidator: str, fetcher: BlockFetcher) -> None:
+    """
+    Gets the liquidation block and the neighbouring blocks check_block will read,
+    so they are cached or stored before check_block runs
+    :param height: height of the liquidation block
+    :param liquidator: str containing liquidator's address
+    :param fetcher: block fetcher
+    """
+    for neighbour_height in get_neighbour_heights(height, liquidator, fetcher):
+        fetcher.get_block(neighbour_height)
+
+
+def plan_fetches(liquidation_lists: dict, fetcher: BlockFetcher) -> dict:
+    """
+    Downloads every block check_liquidations will read for all liquidators, each height once
+    however many liquidators need it. First every liquidation block, then the previous or next
+    block of each liquidation block that starts or ends with a liq tx from its liquidator.
+    Liquidation blocks the oracle index shows have no price_feed tx nearby are skipped
+    :param liquidation_lists: dict of liquidator address -> liquidation list
+    :param fetcher: block fetcher
+    :return: dict with the number of blocks requested by all liquidators, unique heights,
+             blocks downloaded and liquidation blocks skipped
+    """
+    liq_heights = {}  # liquidator -> set of liquidation heights that need their block
+    skipped = set()
+    for liquidator, liquidation_list in liquidation_lists.items():
+        liq_heights[liquidator] = set()
+        for liquidation in liquidation_list:
+            if needs_block(liquidation["height"], fetcher):
+                liq_heights[liquidator].add(liquidation["height"])
+            else:
+                skipped.add(liquidation["height"])
+
+    unique_heights = set().union(*liq_heights.values())
+    downloaded = fetcher.prefetch(unique_heights)
+
+    neighbour_heights = {}  # liquidator -> set of previous and next heights check_block will read
+    for liquidator, heights in liq_heights.items():
+        neighbour_heights[liquidator] = set()
+        for height in heights:
+            neighbour_heights[liquidator].update(get_neighbour_heights(height, liquidator, fetcher))
+
+    unique_neighbours = set().union(*neighbour_heights.values()) - unique_heights
+    downloaded += fetcher.prefetch(unique_neighbours)
+
+    requested = 0
+    for liquidator in liquidation_lists:
+        requested += len(liq_heights[liquidator] | neighbour_heights[liquidator])
+
+    return {
+        "requested": requested,
+        "unique": len(unique_heights) + len(unique_neighbours),
+        "downloaded": downloaded,
+        "skipped": len(skipped),
+    }
+
+
+def print_fetch_plan(plan: dict) -> None:
+    """
+    :param plan: dict returned by plan_fetches
+    """
+    print("Blocks needed by all liquidators: " + str(plan["requested"]))
+    print("Unique blocks: " + str(plan["unique"]))
+    print("Fetches saved by deduplicating: " + str(plan["requested"] - plan["unique"]))
+    print("Blocks downloaded, the rest were stored: " + str(plan["downloaded"]))
+    print("Liquidation blocks skipped, no price_feed nearby: " + str(plan["skipped"]))
+
+
+def get_tx_liquidations(tx: dict) -> list:
+    """
+    :param tx: tx dict from figment transaction search
+    :return: list of dicts with one liquidation for every liquidate_collateral message in tx
+    """
+    liq_list = []
+    compact_tx = project_tx(tx)
+
+    if compact_tx.liquidate:
+        msg_list = get_msg_list(tx)
+        for msg in msg_list:
+            if "liquidate_collateral" in msg:
+                liq_tx = {  # save relevant data to dict
+                    "hash": tx["hash"],
+                    "height": tx["height"],
+                    "execute_message": msg,
+                    "sender": get_sender(compact_tx),
+                    "backrun": False,
+                    "frontrun": False,
+                }
+                liq_list.append(liq_tx)  # append dict to list
+
+    return liq_list
+
+
+def get_liq_txs(sender: str, after_height: int, before_height: int, shards: int, fetcher: BlockFetcher) -> list:
+    """
+    This method gets all liquidate_collateral transations for a given address between after_height and
+    before_height using figment.io transaction search
+    :param sender: string of sender's address
+    :param after_height: int
+    :param before_height: int
+    :param shards: number of height ranges searched at the same time
+    :param fetcher: block fetcher
+    :return: list of dicts containing liquidation txs
+    """
+    liq_list = []
+    tx_list = fetcher.search_txs(sender, after_height, before_height, shards)
+
+    for tx in tx_list:  # iterate tx_list and find all liq txs from liquidator
+        liq_list.extend(get_tx_liquidations(tx))
+
+    return liq_list
+
+
+def iter_liq_txs(sender: str, after_height: int, before_height: int, shards: int, fetcher: BlockFetcher):
+    """
+    Same liquidations as get_liq_txs, yielded as each search page arrives, not in height order
+    :param sender: string of sender's address
+    :param after_height: int
+    :param before_height: int
+    :param shards: number of height ranges searched at the same time
+    :param fetcher: block fetcher
+    :return: generator of dicts containing liquidation txs
+    """
+    for tx in fetcher.iter_txs(sender, after_height, before_height, shards):
+        yield from get_tx_liquidations(tx)
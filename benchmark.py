@@ -0,0 +1,161 @@
+import argparse
+import contextlib
+import importlib
+import io
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from fake_figment import FakeFigment, synthetic_blocks
+
+repo_dir = os.path.dirname(os.path.abspath(__file__))
+tip_blocks = 50  # blocks served past the last height benchmarked, the runs cover final heights like a run over history
+
+# name, script, work dir, a run in the same work dir reuses the stored blocks and checkpoints
+scenarios = [
+    ("liquidator_stats cold", "liquidator_stats", "stats"),
+    ("liquidator_stats warm", "liquidator_stats", "stats"),
+    ("find_frontrun after liquidator_stats", "find_frontrun", "stats"),
+    ("find_frontrun cold", "find_frontrun", "frontrun"),
+]
+
+
+def run_child(args) -> None:
+    """
+    Runs one script's main against the fake server in the current directory and prints its
+    wall time and peak rss as json. Runs in its own process so peak rss is the script's own
+    """
+    module = importlib.import_module(args.child)
+    module.urls = [args.url] * len(module.urls)  # same buckets, every key points at the fake server
+
+    if args.child == "liquidator_stats":
+        module.liquidators = args.liquidators
+        module.first_liq_block = args.first
+        module.last_liq_block = args.last
+        module.suspect_activity_block = (args.first + args.last) // 2
+    else:
+        module.liquidator = args.liquidators[0]
+        module.first_block = args.first
+        module.last_block = args.last
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        module.main()
+    seconds = time.perf_counter() - start
+
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # kB on linux
+    print(json.dumps({"seconds": seconds, "peak_rss_mb": peak_rss}))
+
+
+def run_scenario(figment: FakeFigment, script: str, work_dir: str, args) -> dict:
+    """
+    :param figment: running fake server
+    :param script: module name of the script to run
+    :param work_dir: directory the script runs in
+    :return: dict of results
+    """
+    counts = dict(figment.counts)
+    cmd = [sys.executable, os.path.abspath(__file__), "--child", script, "--url", figment.url]
+    cmd += ["--first", str(args.first), "--last", str(args.last)]
+    for liquidator in args.liquidators:
+        cmd += ["--liquidator", liquidator]
+
+    env = dict(os.environ, PYTHONPATH=repo_dir, MPLBACKEND="Agg")
+    out = subprocess.run(cmd, cwd=work_dir, env=env, check=True, capture_output=True, text=True).stdout
+    result = json.loads(out.strip().splitlines()[-1])
+
+    requests = 0
+    for key in ("block", "search", "throttled"):
+        requests += figment.counts[key] - counts[key]
+
+    result["requests"] = requests
+    result["blocks_downloaded"] = figment.counts["heights"] - counts["heights"]
+    result["mb_downloaded"] = (figment.counts["bytes"] - counts["bytes"]) / 1024 / 1024
+    result["requests_per_sec"] = requests / result["seconds"]
+    result["blocks_per_sec"] = result["blocks_downloaded"] / result["seconds"]
+    return result
+
+
+def print_results(results: dict, previous: dict) -> None:
+    """
+    :param results: dict of scenario name -> results
+    :param previous: results of an earlier run to compare against, may be empty
+    """
+    print("")
+    columns = ("scenario", "seconds", "requests", "blocks", "req/s", "blocks/s", "rss MB")
+    header = "%-38s %9s %9s %9s %10s %10s %9s" % columns
+    print(header)
+    print("-" * len(header))
+
+    for name, result in results.items():
+        line = "%-38s %9.2f %9d %9d %10.1f %10.1f %9.1f" % (
+            name,
+            result["seconds"],
+            result["requests"],
+            result["blocks_downloaded"],
+            result["requests_per_sec"],
+            result["blocks_per_sec"],
+            result["peak_rss_mb"],
+        )
+        if name in previous:
+            change = (result["seconds"] - previous[name]["seconds"]) / previous[name]["seconds"] * 100
+            line += "  %+.1f%% time" % change
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="benchmark both scripts offline against a local figment stand-in")
+    parser.add_argument("--blocks", type=int, default=20000, help="synthetic blocks to serve")
+    parser.add_argument("--liquidators", type=int, default=10, help="synthetic liquidators")
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds added to every request")
+    parser.add_argument("--rate", type=float, default=0.0, help="requests per second before 429s, 0 for no limit")
+    parser.add_argument("--output", help="write results as json, e.g. to compare commits")
+    parser.add_argument("--compare", help="json written by an earlier --output to compare against")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--url", help=argparse.SUPPRESS)
+    parser.add_argument("--first", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--last", type=int, default=3816781, help=argparse.SUPPRESS)
+    parser.add_argument("--liquidator", action="append", dest="liquidator_list", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        args.liquidators = args.liquidator_list
+        run_child(args)
+        return
+
+    args.first = args.last - args.blocks
+    args.liquidators = ["terra1liquidator%d" % i for i in range(args.liquidators)]
+
+    print("generating " + str(args.blocks) + " blocks")
+    blocks = synthetic_blocks(args.first, args.last + tip_blocks, args.liquidators)
+    figment = FakeFigment(blocks, args.latency, args.rate)
+    figment.start()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, script, work_dir in scenarios:
+            work_dir = os.path.join(tmp, work_dir)
+            os.makedirs(work_dir, exist_ok=True)
+            print("running " + name)
+            results[name] = run_scenario(figment, script, work_dir, args)
+
+    figment.stop()
+
+    previous = {}
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)
+
+    print_results(results, previous)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
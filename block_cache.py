@@ -0,0 +1,99 @@
+import pickle
+import sys
+import threading
+import zlib
+from collections import OrderedDict
+
+
+class BlockCache:
+    """
+    In memory block cache with a byte budget, the least recently used blocks are evicted
+    once the budget is exceeded. Blocks can optionally be kept compressed, trading cpu on
+    every hit for about a tenth of the memory. Safe to share between threads
+    """
+
+    def __init__(self, max_bytes: int, compress: bool = False):
+        """
+        :param max_bytes: memory budget for cached blocks
+        :param compress: keep cached blocks zlib compressed
+        """
+        self.max_bytes = max_bytes
+        self.compress = compress
+        self.size = 0
+        self.blocks = OrderedDict()  # height -> (cached block, size), oldest first
+        self.lock = threading.Lock()
+
+    def __contains__(self, height: int) -> bool:
+        return height in self.blocks
+
+    def __getitem__(self, height: int):
+        with self.lock:
+            block, size = self.blocks[height]
+            self.blocks.move_to_end(height)  # mark as most recently used
+
+        if self.compress:
+            return pickle.loads(zlib.decompress(block))
+
+        return block
+
+    def __setitem__(self, height: int, block) -> None:
+        if self.compress:
+            block = zlib.compress(pickle.dumps(block, pickle.HIGHEST_PROTOCOL))
+            size = sys.getsizeof(block)
+        else:
+            size = sizeof(block)
+
+        with self.lock:
+            if height in self.blocks:
+                self.size -= self.blocks.pop(height)[1]
+
+            if size > self.max_bytes:  # never cache a block bigger than the whole budget
+                return
+
+            self.blocks[height] = (block, size)
+            self.size += size
+
+            while self.size > self.max_bytes:  # evict least recently used blocks
+                _, (_, evicted_size) = self.blocks.popitem(last=False)
+                self.size -= evicted_size
+
+    def get(self, height: int, default=None):
+        """
+        :param height: int of block
+        :param default: returned if the block isn't cached
+        :return: cached block or default
+        """
+        try:
+            return self[height]
+        except KeyError:
+            return default
+
+    def __len__(self) -> int:
+        return len(self.blocks)
+
+    def clear(self) -> None:
+        with self.lock:
+            self.blocks.clear()
+            self.size = 0
+
+
+def sizeof(obj) -> int:
+    """
+    Estimates the memory used by obj and everything it references,
+    shared objects are counted every time they are referenced
+    :param obj: object to measure
+    :return: size in bytes
+    """
+    if hasattr(obj, "nbytes"):  # objects that know their own size, like CompactBlock
+        return obj.nbytes
+
+    size = sys.getsizeof(obj)
+
+    if isinstance(obj, dict):
+        for key, val in obj.items():
+            size += sizeof(key) + sizeof(val)
+    elif isinstance(obj, (list, tuple)):
+        for item in obj:
+            size += sizeof(item)
+
+    return size
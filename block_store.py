@@ -0,0 +1,160 @@
+import json
+import sqlite3
+import threading
+import zlib
+
+import fastjson
+
+store_path = "blocks.db"
+
+
+class BlockStore:
+    """
+    Persistent block store shared by liquidator_stats.py and find_frontrun.py.
+    Blocks are keyed by height and saved as zlib compressed json in a sqlite file,
+    transaction search pages are saved the same way keyed by their query, and the oracle index keeps
+    the heights each feeder fed at over the ranges it has searched. The newest height figment was
+    seen to have indexed is kept too. Safe to share between threads
+    """
+
+    def __init__(self, path: str = store_path):
+        """
+        :param path: path of the sqlite file
+        """
+        self.path = path
+        self.conn = sqlite3.connect(path, timeout=60, check_same_thread=False)
+        self.lock = threading.Lock()
+        self.conn.execute("PRAGMA journal_mode=WAL")  # lets both scripts read while the other writes
+        # commits don't wait on fsync, a crash only loses the last blocks
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS blocks (height INTEGER PRIMARY KEY, data BLOB NOT NULL)")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS searches (query TEXT PRIMARY KEY, data BLOB NOT NULL)")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS feeds (feeder TEXT, height INTEGER, PRIMARY KEY (feeder, height)) WITHOUT ROWID"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS feed_ranges (feeder TEXT, first_height INTEGER, last_height INTEGER)"
+        )
+        self.conn.execute("CREATE TABLE IF NOT EXISTS tip (id INTEGER PRIMARY KEY CHECK (id = 0), height INTEGER)")
+        self.conn.commit()
+
+    def __contains__(self, height: int) -> bool:
+        return self.fetch("SELECT 1 FROM blocks WHERE height = ?", (height,)) is not None
+
+    def __getitem__(self, height: int) -> list:
+        """
+        :param height: int of block
+        :return: list containing block, raises KeyError if the block isn't stored
+        """
+        row = self.fetch("SELECT data FROM blocks WHERE height = ?", (height,))
+        if row is None:
+            raise KeyError(height)
+
+        return decode(row[0])
+
+    def __setitem__(self, height: int, block: list) -> None:
+        self.write("INSERT OR REPLACE INTO blocks VALUES (?, ?)", (height, encode(block)))
+
+    def __len__(self) -> int:
+        return self.fetch("SELECT COUNT(*) FROM blocks", ())[0]
+
+    def get_search(self, query: dict) -> list:
+        """
+        :param query: transaction search request data
+        :return: list of txs returned for the query, raises KeyError if the query isn't stored
+        """
+        row = self.fetch("SELECT data FROM searches WHERE query = ?", (query_key(query),))
+        if row is None:
+            raise KeyError(query_key(query))
+
+        return decode(row[0])
+
+    def put_search(self, query: dict, tx_list: list) -> None:
+        """
+        Only use for height ranges that are already final, the result is never refreshed
+        :param query: transaction search request data
+        :param tx_list: list of txs returned for the query
+        """
+        self.write("INSERT OR REPLACE INTO searches VALUES (?, ?)", (query_key(query), encode(tx_list)))
+
+    def get_feed_ranges(self, feeder: str) -> list:
+        """
+        :param feeder: str containing the feeder's address
+        :return: list of (first_height, last_height) ranges the feeder's txs were searched in
+        """
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT first_height, last_height FROM feed_ranges WHERE feeder = ?", (feeder,)
+            ).fetchall()
+
+        return [tuple(row) for row in rows]
+
+    def get_feed_heights(self, feeder: str) -> set:
+        """
+        :param feeder: str containing the feeder's address
+        :return: set of heights the feeder sent an execute_contract tx at
+        """
+        with self.lock:
+            rows = self.conn.execute("SELECT height FROM feeds WHERE feeder = ?", (feeder,)).fetchall()
+
+        return {row[0] for row in rows}
+
+    def put_feeds(self, feeder: str, first_height: int, last_height: int, heights: set) -> None:
+        """
+        Saves the feed heights of a searched range and marks the range covered in one transaction
+        :param feeder: str containing the feeder's address
+        :param first_height: first height searched
+        :param last_height: last height searched, inclusive
+        :param heights: heights in the range the feeder sent an execute_contract tx at
+        """
+        with self.lock, self.conn:
+            self.conn.executemany("INSERT OR IGNORE INTO feeds VALUES (?, ?)", [(feeder, height) for height in heights])
+            self.conn.execute("INSERT INTO feed_ranges VALUES (?, ?, ?)", (feeder, first_height, last_height))
+
+    def get_tip(self) -> int:
+        """
+        :return: newest indexed height a previous run saw, 0 if none did
+        """
+        row = self.fetch("SELECT height FROM tip WHERE id = 0", ())
+        return 0 if row is None else row[0]
+
+    def put_tip(self, height: int) -> None:
+        """
+        :param height: newest indexed height seen, kept only if it's newer than the saved one
+        """
+        self.write(
+            "INSERT INTO tip VALUES (0, ?) ON CONFLICT (id) DO UPDATE SET height = MAX(height, excluded.height)",
+            (height,),
+        )
+
+    def fetch(self, sql: str, params: tuple) -> tuple:
+        """
+        :return: first row of the query, None if there are no rows
+        """
+        with self.lock:
+            return self.conn.execute(sql, params).fetchone()
+
+    def write(self, sql: str, params: tuple) -> None:
+        with self.lock:
+            self.conn.execute(sql, params)
+            self.conn.commit()  # commit every write so an interrupted run keeps what it downloaded
+
+    def close(self) -> None:
+        with self.lock:
+            self.conn.close()
+
+
+def query_key(query: dict) -> str:
+    """
+    :param query: transaction search request data
+    :return: str that is the same for equal queries
+    """
+    return json.dumps(query, sort_keys=True, separators=(",", ":"))
+
+
+def encode(data) -> bytes:
+    return zlib.compress(fastjson.dumps(data))
+
+
+def decode(data: bytes):
+    return fastjson.loads(zlib.decompress(data))
@@ -0,0 +1,168 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+renderer = None  # ChartRenderer of a render worker process
+
+
+def graph_columns(graph_dict: dict) -> tuple:
+    """
+    :param graph_dict: dictionary containing graph data
+    :return: tuple of bucket start labels, backrun counts and normal counts
+    """
+    labels, backrun, normal = [], [], []
+
+    for key, val in graph_dict.items():
+        labels.append(key)
+        backrun.append(val["backrun"])
+        normal.append(val["normal"])
+
+    return labels, backrun, normal
+
+
+def draw_bars(axes, labels: list, backrun: list, normal: list, title: str) -> tuple:
+    """
+    Draws the backrun and normal bars of one liquidator the way plot_graph always has
+    :param axes: matplotlib axes to draw on
+    :return: tuple of the backrun and normal bar containers
+    """
+    x_axis = np.arange(len(labels))
+
+    axes.set_title(title)
+    axes.set_xlabel("Height")
+    axes.set_ylabel("Liquidation Attempts")
+
+    backrun_bars = axes.bar(x_axis - 0.2, backrun, 0.4, label="backrun")
+    normal_bars = axes.bar(x_axis + 0.2, normal, 0.4, label="normal")
+    axes.set_xticks(x_axis[::10])
+    axes.set_xticklabels(labels[::10], rotation=90)
+
+    axes.legend()
+    return backrun_bars, normal_bars
+
+
+class ChartRenderer:
+    """
+    Renders liquidator graphs on one Agg figure without pyplot. The figure, axes and bars are
+    built once and only the bar heights, title and y scale change between liquidators, as long
+    as every graph has the same buckets
+    """
+
+    def __init__(self, dpi: int = 600, fmt: str = "png"):
+        """
+        :param dpi: resolution of png files
+        :param fmt: "png" or "svg"
+        """
+        self.dpi = dpi
+        self.fmt = fmt
+        self.figure = Figure()
+        FigureCanvasAgg(self.figure)
+        self.axes = self.figure.add_subplot()
+        self.labels = None
+        self.bars = None
+        self.top = None  # highest bar when the layout was last fitted
+
+    def render(self, graph_dict: dict, liquidator: str) -> str:
+        """
+        Saves the graph of liquidator to liquidator.png or liquidator.svg
+        :param graph_dict: dictionary containing graph data
+        :param liquidator: string
+        :return: path of the saved file
+        """
+        labels, backrun, normal = graph_columns(graph_dict)
+        top = max(backrun + normal, default=0)
+
+        if labels != self.labels:  # different buckets, draw the bars again
+            self.axes.clear()
+            self.bars = draw_bars(self.axes, labels, backrun, normal, liquidator)
+            self.labels = labels
+            self.top = None
+        else:
+            backrun_bars, normal_bars = self.bars
+            for bar, height in zip(backrun_bars, backrun):
+                bar.set_height(height)
+            for bar, height in zip(normal_bars, normal):
+                bar.set_height(height)
+            self.axes.set_title(liquidator)
+            if top > 0:
+                self.axes.set_ylim(0, top * 1.05)  # what autoscaling gives bars from 0, without walking every bar
+            else:
+                self.axes.relim()
+                self.axes.autoscale_view()
+
+        if self.top is None or len(str(top)) != len(str(self.top)):  # y tick labels only get wider with more digits
+            self.figure.tight_layout()
+            self.top = top
+
+        path = liquidator + "." + self.fmt
+        self.figure.savefig(path, format=self.fmt, dpi=self.dpi)
+        return path
+
+
+def render_panels(graphs: dict, path: str, dpi: int = 600, fmt: str = "png") -> str:
+    """
+    Saves the graphs of every liquidator as panels of a single figure, one under another
+    :param graphs: dict of liquidator -> graph dict
+    :param path: path of the saved file without the extension
+    :param dpi: resolution of a png file
+    :param fmt: "png" or "svg"
+    :return: path of the saved file
+    """
+    figure = Figure(figsize=(6.4, 3.2 * len(graphs)))
+    FigureCanvasAgg(figure)
+    axes_list = figure.subplots(len(graphs), 1, squeeze=False)[:, 0]
+
+    for axes, (liquidator, graph_dict) in zip(axes_list, graphs.items()):
+        draw_bars(axes, *graph_columns(graph_dict), liquidator)
+
+    figure.tight_layout()
+    path = path + "." + fmt
+    figure.savefig(path, format=fmt, dpi=dpi)
+    return path
+
+
+def init_renderer(dpi: int, fmt: str) -> None:
+    """
+    Runs once in every render worker process
+    """
+    global renderer
+    renderer = ChartRenderer(dpi, fmt)
+
+
+def render_item(item: tuple) -> str:
+    """
+    :param item: tuple of liquidator and graph dict
+    :return: path of the saved file
+    """
+    liquidator, graph_dict = item
+    return renderer.render(graph_dict, liquidator)
+
+
+def render_graphs(graphs: dict, dpi: int = 600, fmt: str = "png", panels: bool = False, workers: int = 0) -> list:
+    """
+    Saves the graph of every liquidator
+    :param graphs: dict of liquidator -> graph dict
+    :param dpi: resolution of png files
+    :param fmt: "png" or "svg"
+    :param panels: save one figure with a panel per liquidator, liquidators.png, instead of a file each
+    :param workers: processes rendering at the same time, 0 renders in this process
+    :return: list of saved paths
+    """
+    if not graphs:
+        return []
+
+    if panels:
+        return [render_panels(graphs, "liquidators", dpi, fmt)]
+
+    if workers:
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(
+            max_workers=workers, mp_context=context, initializer=init_renderer, initargs=(dpi, fmt)
+        ) as pool:
+            return list(pool.map(render_item, graphs.items()))
+
+    local = ChartRenderer(dpi, fmt)
+    return [local.render(graph_dict, liquidator) for liquidator, graph_dict in graphs.items()]
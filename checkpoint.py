@@ -0,0 +1,187 @@
+import json
+import sqlite3
+import threading
+
+from analysis import check_liquidations, get_liq_txs, plan_fetches
+from fetcher import BlockFetcher
+from instrumentation import metrics
+
+checkpoint_path = "checkpoints.db"
+
+
+class Checkpoints:
+    """
+    Checked liquidations of every liquidator saved in a sqlite file together with the highest
+    height they cover, so later runs only search and check the blocks after it. Runs are keyed
+    by liquidator and first height, a run over a different start height doesn't reuse them
+    """
+
+    def __init__(self, path: str = checkpoint_path):
+        """
+        :param path: path of the sqlite file
+        """
+        self.path = path
+        self.conn = sqlite3.connect(path, timeout=60, check_same_thread=False)
+        self.lock = threading.Lock()
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS covered "
+            "(liquidator TEXT, first_height INTEGER, last_height INTEGER, PRIMARY KEY (liquidator, first_height))"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS liquidations "
+            "(id INTEGER PRIMARY KEY AUTOINCREMENT, liquidator TEXT, first_height INTEGER, height INTEGER, data TEXT)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS liquidations_run ON liquidations (liquidator, first_height)")
+        self.conn.commit()
+
+    def last_height(self, liquidator: str, first_height: int) -> int:
+        """
+        :param liquidator: str containing liquidator's address
+        :param first_height: first height of the run
+        :return: highest height the saved liquidations cover, None if nothing is saved
+        """
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT last_height FROM covered WHERE liquidator = ? AND first_height = ?", (liquidator, first_height)
+            ).fetchone()
+
+        if row is None:
+            return None
+
+        return row[0]
+
+    def append(self, liquidator: str, first_height: int, liquidation_list: list, last_height: int) -> None:
+        """
+        Saves checked liquidations and moves the covered height up in one transaction,
+        so an interrupted run never saves a range twice
+        :param liquidator: str containing liquidator's address
+        :param first_height: first height of the run
+        :param liquidation_list: checked liquidations up to last_height
+        :param last_height: highest height covered after this append
+        """
+        rows = []
+        for liquidation in liquidation_list:
+            rows.append((liquidator, first_height, liquidation["height"], json.dumps(liquidation)))
+
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "INSERT INTO liquidations (liquidator, first_height, height, data) VALUES (?, ?, ?, ?)", rows
+            )
+            self.conn.execute(
+                "INSERT OR REPLACE INTO covered VALUES (?, ?, ?)", (liquidator, first_height, last_height)
+            )
+
+    def load(self, liquidator: str, first_height: int, last_height: int) -> list:
+        """
+        :param liquidator: str containing liquidator's address
+        :param first_height: first height of the run
+        :param last_height: liquidations above this height are left out
+        :return: saved liquidation list, newest first like get_liq_txs
+        """
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT data FROM liquidations WHERE liquidator = ? AND first_height = ? AND height <= ? "
+                "ORDER BY height DESC, id",
+                (liquidator, first_height, last_height),
+            ).fetchall()
+
+        return [json.loads(row[0]) for row in rows]
+
+    def close(self) -> None:
+        with self.lock:
+            self.conn.close()
+
+
+def get_chunk_liq_txs(
+    liquidator: str, first_height: int, after_height: int, before_height: int, shards: int, fetcher: BlockFetcher
+) -> list:
+    """
+    Gets the liquidations after after_height up to and including before_height. The search
+    is widened by a block on each side and filtered, so chunks neither overlap nor miss the
+    heights between them whether figment's bounds are inclusive or not
+    :param liquidator: str containing liquidator's address
+    :param first_height: first height of the run, searched the same way as a single run would
+    :param after_height: last height already covered
+    :param before_height: last height to cover
+    :param shards: number of height ranges searched at the same time
+    :param fetcher: block fetcher
+    :return: list of dicts containing liquidation txs
+    """
+    if after_height == first_height:
+        liq_list = get_liq_txs(liquidator, first_height, before_height + 1, shards, fetcher)
+        return [liquidation for liquidation in liq_list if liquidation["height"] <= before_height]
+
+    liq_list = get_liq_txs(liquidator, after_height - 1, before_height + 1, shards, fetcher)
+    return [liquidation for liquidation in liq_list if after_height < liquidation["height"] <= before_height]
+
+
+def update_checkpoints(
+    liquidators: list,
+    first_height: int,
+    last_height: int,
+    interval: int,
+    shards: int,
+    fetcher: BlockFetcher,
+    checkpoints: Checkpoints,
+    check: bool = True,
+) -> dict:
+    """
+    Searches and checks every liquidator from its last checkpoint up to last_height, interval
+    blocks at a time. The blocks of each interval are planned across all liquidators that need
+    it, and every liquidator is checkpointed once its interval is checked, so an interrupted
+    run picks up from the last finished interval. Heights past the fetcher's final height are
+    left for a later run, figment may still be indexing them. With check false the searches and
+    blocks are only downloaded into the store and nothing is checkpointed, for other processes to check
+    :param liquidators: list of liquidator addresses
+    :param first_height: first height of the run
+    :param last_height: last height of the run, lowered to the final height if it's past it
+    :param interval: blocks searched and checked between checkpoints
+    :param shards: number of height ranges searched at the same time
+    :param fetcher: block fetcher
+    :param checkpoints: checkpoint store
+    :param check: check and checkpoint the liquidations after downloading their blocks
+    :return: dict of fetch plan totals over all intervals, like plan_fetches returns
+    """
+    starts = {}  # liquidator -> last height covered
+    for liquidator in liquidators:
+        covered = checkpoints.last_height(liquidator, first_height)
+        starts[liquidator] = first_height if covered is None else covered
+
+    plan = {"requested": 0, "unique": 0, "downloaded": 0, "skipped": 0}
+
+    if not fetcher.is_final(last_height + 1):  # chunks search a block past their end
+        print("Checking up to height " + str(fetcher.final_height() - 1) + " instead of " + str(last_height), end="")
+        print(", figment may not have indexed every tx after it yet")
+        last_height = fetcher.final_height() - 1
+
+    for chunk_start in range(min(starts.values(), default=last_height), last_height, interval):
+        chunk_end = min(chunk_start + interval, last_height)
+
+        liquidation_lists = {}
+        for liquidator in liquidators:
+            if starts[liquidator] < chunk_end:
+                after_height = max(chunk_start, starts[liquidator])
+                with metrics.timer("liquidator " + liquidator):
+                    liquidation_lists[liquidator] = get_chunk_liq_txs(
+                        liquidator, first_height, after_height, chunk_end, shards, fetcher
+                    )
+
+        if fetcher.oracle_index is not None:  # feeds around every liquidation block of the chunk
+            fetcher.oracle_index.cover(chunk_start - 1, chunk_end + 1, shards, fetcher)
+
+        with metrics.timer("plan fetches"):
+            chunk_plan = plan_fetches(liquidation_lists, fetcher)
+        for key in plan:
+            plan[key] += chunk_plan[key]
+
+        if not check:
+            continue
+
+        for liquidator, liquidation_list in liquidation_lists.items():
+            with metrics.timer("liquidator " + liquidator):
+                check_liquidations(liquidation_list, liquidator, fetcher)
+            checkpoints.append(liquidator, first_height, liquidation_list, chunk_end)
+            starts[liquidator] = chunk_end
+
+    return plan
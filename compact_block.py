@@ -0,0 +1,208 @@
+import base64
+import sys
+
+import fastjson
+
+oracle_feeder = "terra1zue382qey9l5uhhwcwumjhmsne49a0agwhd60d"
+liquidate_key = b'"liquidate_collateral"'
+no_liquidators = {}  # shared by every block without a liq tx, never written to
+
+
+class CompactTx:
+    """
+    The parts of a figment tx the backrun and frontrun checks read. kind and sender are
+    interned so every tx from the same address shares one string
+    """
+
+    __slots__ = ("kind", "sender", "liquidate")
+
+    def __init__(self, kind: str, sender: str, liquidate: bool):
+        """
+        :param kind: str containing tx type
+        :param sender: str containing sender's address, None if the tx has no sender
+        :param liquidate: true if the tx has a liquidate_collateral execute message
+        """
+        self.kind = kind
+        self.sender = sender
+        self.liquidate = liquidate
+
+    def __repr__(self) -> str:
+        return "CompactTx(" + repr(self.kind) + ", " + repr(self.sender) + ", " + repr(self.liquidate) + ")"
+
+
+class BlockIndex:
+    """
+    Where the txs the backrun and frontrun checks look at sit in a block, found in one pass
+    when the block is projected. Classifying a liquidation is then a few lookups instead of a
+    walk over the block for every liq tx
+    """
+
+    __slots__ = ("liquidators", "feeds", "head_sender", "head_end", "tail_sender", "tail_start", "last")
+
+    def __init__(self, txs: tuple):
+        """
+        :param txs: tuple of CompactTx in block order
+        """
+        is_feed = [tx.kind == "execute_contract" and tx.sender == oracle_feeder for tx in txs] + [False]
+        self.feeds = tuple(i for i, feed in enumerate(is_feed) if feed)  # positions of price_feed txs
+        self.last = len(txs) - 1
+
+        liquidators = {}  # sender -> [first liq tx position, last liq tx position, backrun, frontrun]
+        for i, tx in enumerate(txs):
+            if tx.liquidate and tx.kind == "execute_contract" and tx.sender is not None:
+                found = liquidators.get(tx.sender)
+                if found is None:
+                    found = liquidators[tx.sender] = [i, i, False, False]
+                found[1] = i
+                if i > 0 and is_feed[i - 1]:  # liq tx right after a price_feed tx
+                    found[2] = True
+                if is_feed[i + 1]:  # liq tx right before a price_feed tx, is_feed ends with a False
+                    found[3] = True
+
+        if liquidators:
+            self.liquidators = {sender: tuple(found) for sender, found in liquidators.items()}
+        else:
+            self.liquidators = no_liquidators
+
+        self.head_sender, head_run = edge_run(txs)
+        self.head_end = head_run  # position of the first tx after the run
+        self.tail_sender, tail_run = edge_run(reversed(txs))
+        self.tail_start = self.last - tail_run  # position of the last tx before the run
+
+    def feed_at_edge(self, liquidator: str, end: bool = False) -> bool:
+        """
+        Same answer as walking the block from its start, or its end, over the liquidator's
+        execute_contract txs and checking if the first other tx is a price_feed tx
+        :param liquidator: str containing liquidator's address
+        :param end: walk from the end of the block instead of the start
+        :return: true if a price_feed tx is right next to the liquidator's txs at the edge
+        """
+        if end:
+            position = self.tail_start if self.tail_sender == liquidator else self.last
+        else:
+            position = self.head_end if self.head_sender == liquidator else 0
+
+        return position in self.feeds
+
+    @property
+    def nbytes(self) -> int:
+        """
+        :return: size in bytes, the shared empty liquidators dict and interned strings are not counted
+        """
+        size = sys.getsizeof(self) + sys.getsizeof(self.feeds)
+        if self.liquidators is not no_liquidators:
+            size += sys.getsizeof(self.liquidators)
+            size += sum(sys.getsizeof(found) for found in self.liquidators.values())
+
+        return size
+
+
+class CompactBlock:
+    """
+    A block of CompactTx, indexes and iterates like the list of txs it was projected from.
+    index is built with the block and cached with it
+    """
+
+    __slots__ = ("txs", "index")
+
+    def __init__(self, txs: tuple):
+        """
+        :param txs: tuple of CompactTx in block order
+        """
+        self.txs = txs
+        self.index = BlockIndex(txs)
+
+    def __len__(self) -> int:
+        return len(self.txs)
+
+    def __getitem__(self, i: int) -> CompactTx:
+        return self.txs[i]
+
+    def __iter__(self):
+        return iter(self.txs)
+
+    def __reversed__(self):
+        return reversed(self.txs)
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Memory used by the block, interned strings are shared and not counted
+        :return: size in bytes
+        """
+        size = sys.getsizeof(self) + sys.getsizeof(self.txs) + self.index.nbytes
+        if self.txs:
+            size += len(self.txs) * sys.getsizeof(self.txs[0])
+
+        return size
+
+
+def edge_run(txs) -> tuple:
+    """
+    :param txs: iterable of CompactTx from an edge of a block inwards
+    :return: tuple of the sender of the execute_contract txs the block starts with, None if it doesn't
+             start with one, and how many txs from that sender it starts with
+    """
+    sender = None
+    run = 0
+
+    for tx in txs:
+        if tx.kind != "execute_contract" or tx.sender is None:
+            break
+        if sender is None:
+            sender = tx.sender
+        elif tx.sender != sender:
+            break
+        run += 1
+
+    return sender, run
+
+
+def project_tx(tx: dict) -> CompactTx:
+    """
+    Takes a figment tx dict and keeps only what the checks read
+    :param tx: tx dict
+    :return: CompactTx
+    """
+    event = tx["events"][0]
+    kind = sys.intern(event["kind"])
+
+    try:
+        sender = sys.intern(event["sub"][0]["sender"][0]["account"]["id"])
+    except (KeyError, IndexError, TypeError):  # not every tx type has a sender
+        sender = None
+
+    liquidate = False
+    if kind == "execute_contract":
+        for msg in event["sub"][0].get("additional", {}).get("execute_message", []):
+            if is_liquidate(msg):
+                liquidate = True
+                break
+
+    return CompactTx(kind, sender, liquidate)
+
+
+def is_liquidate(msg: str) -> bool:
+    """
+    Looks for the liquidate_collateral key in the decoded bytes and only parses the
+    message if it's there, so almost no message is ever parsed
+    :param msg: base64 encoded execute message
+    :return: true if the message is a liquidate_collateral
+    """
+    raw = base64.b64decode(msg)
+    if liquidate_key not in raw:
+        return False
+
+    return "liquidate_collateral" in fastjson.loads(raw)  # the key could be a value deeper in the message
+
+
+def project_block(block: list) -> CompactBlock:
+    """
+    Projects every tx of a figment block
+    :param block: list containing block
+    :return: CompactBlock, None if block is None
+    """
+    if block is None:
+        return None
+
+    return CompactBlock(tuple(project_tx(tx) for tx in block))
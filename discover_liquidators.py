@@ -0,0 +1,49 @@
+from instrumentation import metrics, profiling, report
+from sweep import merge_counts, print_ranking, rank, sweep
+
+apikeys = [""]  # requests are spread over every key, each with its own rate limit
+
+url_head = "https://terra--search.datahub.figment.io/apikey/"
+url_tail = "/transactions_search"
+urls = [url_head + apikey + url_tail for apikey in apikeys]
+
+cache_bytes = 64 * 1024 * 1024  # memory budget for cached blocks of each sweep process
+fetch_workers = 16  # most requests to figment in flight at once, split between the sweep processes
+request_rate = 0  # requests per second allowed per api key, 0 for no limit, split between the sweep processes
+sweep_processes = 4  # processes sweeping height shards at the same time, 0 sweeps in this process
+sweep_shards = 64  # height ranges the sweep is split into, a shard's blocks are dropped from memory once it's done
+metrics_path = ""  # write the run metrics as json to this path, empty to only print them
+profile_cpu = False  # run cProfile on the main thread and print the top functions
+profile_memory = False  # run tracemalloc and print the top allocations
+
+first_block = 3757709
+last_block = 3816781
+
+
+def main():
+    """
+    Sweeps every block from first_block to last_block for liquidate_collateral txs and prints
+    every liquidator found, ranked by liquidation txs, with its backrun and frontrun share
+    """
+    counts = {}
+    done = 0
+
+    for (first_height, last_height), shard_counts in sweep(
+        first_block, last_block, urls, request_rate, fetch_workers, cache_bytes, sweep_processes, sweep_shards
+    ):
+        merge_counts(counts, shard_counts)
+        done += 1
+        print("shard %d-%d done (%d shards), %d liquidators so far" % (first_height, last_height, done, len(counts)))
+
+    print_ranking(rank(counts))
+    metrics.count("liquidators found", len(counts))
+    report(metrics_path)
+
+
+if __name__ == "__main__":
+    if "" in apikeys:
+        print("figment.io apikey missing")
+        quit()
+
+    with profiling(profile_cpu, profile_memory):
+        main()
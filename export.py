@@ -0,0 +1,81 @@
+import os
+
+import numpy as np
+
+# column -> numpy dtype, strings are fixed width bytes sized to the longest value
+columns = {
+    "hash": "S",
+    "height": np.int64,
+    "sender": "S",
+    "borrower": "S",
+    "collateral_token": "S",
+    "backrun": bool,
+    "frontrun": bool,
+}
+
+
+def flatten_liquidation(liquidation: dict) -> dict:
+    """
+    Keeps the fields of a liquidation that are exported, with the liquidate_collateral
+    message flattened into its borrower and collateral token
+    :param liquidation: liquidation dict from get_liq_txs or the checkpoints, or an already flattened one
+    :return: dict with a value for every column, empty strings for fields the message doesn't have
+    """
+    msg = liquidation.get("execute_message", {}).get("liquidate_collateral", liquidation)
+
+    return {
+        "hash": liquidation.get("hash", ""),
+        "height": liquidation["height"],
+        "sender": liquidation.get("sender", ""),
+        "borrower": msg.get("borrower", ""),
+        "collateral_token": msg.get("collateral_token", ""),
+        "backrun": liquidation.get("backrun", False),
+        "frontrun": liquidation.get("frontrun", False),
+    }
+
+
+def liquidation_columns(liquidation_list: list) -> dict:
+    """
+    :param liquidation_list: list of liquidation dicts, full or flattened
+    :return: dict of column -> numpy array, rows sorted by height
+    """
+    rows = [flatten_liquidation(liquidation) for liquidation in liquidation_list]
+    order = np.argsort(np.fromiter((row["height"] for row in rows), np.int64, len(rows)), kind="stable")
+
+    arrays = {}
+    for name, dtype in columns.items():
+        if dtype == "S":
+            values = np.array([row[name].encode() for row in rows], dtype="S")
+        else:
+            values = np.fromiter((row[name] for row in rows), dtype, len(rows))
+        arrays[name] = values[order]
+
+    return arrays
+
+
+def write_columns(liquidation_list: list, path: str) -> int:
+    """
+    Writes every column as its own .npy file in the path directory, so notebooks can memory map
+    and filter them with read_columns without loading json or running the scripts
+    :param liquidation_list: list of liquidation dicts, full or flattened
+    :param path: directory to write to, created if missing, earlier columns are replaced
+    :return: number of rows written
+    """
+    os.makedirs(path, exist_ok=True)
+    arrays = liquidation_columns(liquidation_list)
+
+    for name, values in arrays.items():
+        np.save(os.path.join(path, name + ".npy"), values)
+
+    return len(arrays["height"])
+
+
+def read_columns(path: str, mmap: bool = True) -> dict:
+    """
+    e.g. cols = read_columns("liquidations"); cols["hash"][cols["backrun"] & (cols["height"] > 3757709)]
+    :param path: directory written by write_columns
+    :param mmap: memory map the columns instead of reading them into memory
+    :return: dict of column -> numpy array
+    """
+    mode = "r" if mmap else None
+    return {name: np.load(os.path.join(path, name + ".npy"), mmap_mode=mode) for name in columns}
@@ -0,0 +1,260 @@
+import argparse
+import base64
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from block_store import BlockStore, decode
+from compact_block import oracle_feeder
+
+page_size = 100
+
+
+class FakeFigment:
+    """
+    Local stand-in for figment's /transactions_search, serving blocks from fixtures so the
+    scripts can run and be benchmarked without an api key. Supports height queries, sender
+    queries between after_height and before_height (both inclusive), offset/limit paging,
+    a fixed latency per request and a requests per second limit answered with 429s
+    """
+
+    def __init__(self, blocks: dict, latency: float = 0.0, rate: float = 0.0, host: str = "127.0.0.1", port: int = 0):
+        """
+        :param blocks: dict of height -> list of figment tx dicts
+        :param latency: seconds added to every request
+        :param rate: requests per second allowed before answering 429, 0 for no limit
+        :param host: address to listen on
+        :param port: port to listen on, 0 picks a free port
+        """
+        self.blocks = blocks
+        self.latency = latency
+        self.rate = rate
+        self.tokens = rate
+        self.refilled = time.monotonic()
+        self.lock = threading.Lock()
+        self.counts = {"block": 0, "heights": 0, "search": 0, "throttled": 0, "bytes": 0}
+
+        self.sender_txs = {}  # sender -> list of txs, newest first
+        for height in sorted(blocks, reverse=True):
+            for tx in blocks[height]:
+                sender = get_tx_sender(tx)
+                if sender is not None:
+                    self.sender_txs.setdefault(sender, []).append(tx)
+
+        self.server = ThreadingHTTPServer((host, port), make_handler(self))
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return "http://" + host + ":" + str(port) + "/apikey/fake/transactions_search"
+
+    def start(self) -> None:
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def throttle(self) -> bool:
+        """
+        Token bucket holding one second of requests
+        :return: true if the request is over the rate limit
+        """
+        if not self.rate:
+            return False
+
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.rate, self.tokens + (now - self.refilled) * self.rate)
+            self.refilled = now
+
+            if self.tokens < 1:
+                self.counts["throttled"] += 1
+                return True
+
+            self.tokens -= 1
+            return False
+
+    def search(self, data: dict) -> list:
+        """
+        :param data: transaction search request data
+        :return: list of txs for the request
+        """
+        offset = data.get("offset", 0)
+
+        if "height" in data:
+            self.count("block")
+            if offset == 0:
+                self.count("heights")
+            return self.blocks.get(data["height"], [])[offset : offset + page_size]
+
+        self.count("search")
+        limit = min(data.get("limit", page_size), page_size)
+        tx_list = []
+
+        for sender in data.get("sender", []):
+            for tx in self.sender_txs.get(sender, []):
+                if data["after_height"] <= tx["height"] <= data["before_height"]:
+                    tx_list.append(tx)
+
+        return tx_list[offset : offset + limit]
+
+    def count(self, key: str, n: int = 1) -> None:
+        with self.lock:
+            self.counts[key] += n
+
+
+def make_handler(figment: FakeFigment):
+    """
+    :param figment: server state shared by every request
+    :return: request handler class for ThreadingHTTPServer
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive like the real api
+
+        def do_POST(self):
+            data = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+
+            if figment.latency:
+                time.sleep(figment.latency)
+
+            if figment.throttle():
+                self.reply(429, b'{"error": "rate limit exceeded"}')
+                return
+
+            self.reply(200, json.dumps(figment.search(data)).encode())
+
+        def reply(self, status: int, body: bytes) -> None:
+            figment.count("bytes", len(body))
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):  # don't print every request
+            pass
+
+    return Handler
+
+
+def get_tx_sender(tx: dict) -> str:
+    """
+    :param tx: figment tx dict
+    :return: sender's address, None if the tx has no sender
+    """
+    try:
+        return tx["events"][0]["sub"][0]["sender"][0]["account"]["id"]
+    except (KeyError, IndexError, TypeError):
+        return None
+
+
+def make_tx(height: int, index: int, kind: str, sender: str, messages: list) -> dict:
+    """
+    :return: figment tx dict with only the fields the scripts read
+    """
+    execute_message = [base64.b64encode(json.dumps(msg).encode()).decode() for msg in messages]
+    return {
+        "hash": "%064X" % (height * 1000 + index),
+        "height": height,
+        "events": [
+            {
+                "kind": kind,
+                "sub": [{"sender": [{"account": {"id": sender}}], "additional": {"execute_message": execute_message}}],
+            }
+        ],
+    }
+
+
+def synthetic_blocks(first_height: int, last_height: int, liquidators: list, seed: int = 0) -> dict:
+    """
+    Generates random blocks of oracle feeds, liquidations from liquidators and filler txs.
+    A few blocks are over 100 txs and some of those over 200, so the second page and the pages
+    requested after the first two are exercised
+    :param first_height: first block height
+    :param last_height: last block height, inclusive
+    :param liquidators: list of liquidator addresses
+    :param seed: random seed, the same seed always gives the same blocks
+    :return: dict of height -> list of figment tx dicts
+    """
+    rand = random.Random(seed)
+    blocks = {}
+
+    for height in range(first_height, last_height + 1):
+        kinds = []
+        size = rand.randint(100, 350) if rand.random() < 0.02 else rand.randint(0, 8)
+
+        for _ in range(size):
+            r = rand.random()
+            if r < 0.15:
+                kinds.append("oracle")
+            elif r < 0.3:
+                kinds.append("liquidate")
+            elif r < 0.45:
+                kinds.append("send")
+            else:
+                kinds.append("other")
+
+        block = []
+        for index, kind in enumerate(kinds):
+            if kind == "oracle":
+                msg = {"feed_price": {"prices": []}}
+                block.append(make_tx(height, index, "execute_contract", oracle_feeder, [msg]))
+            elif kind == "liquidate":
+                msg = {"liquidate_collateral": {"borrower": "terra1borrower%d" % rand.randint(0, 999)}}
+                block.append(make_tx(height, index, "execute_contract", rand.choice(liquidators), [msg]))
+            elif kind == "send":
+                block.append(make_tx(height, index, "send", "terra1sender%d" % rand.randint(0, 99), []))
+            else:
+                block.append(make_tx(height, index, "execute_contract", "terra1other", [{"deposit_stable": {}}]))
+
+        blocks[height] = block
+
+    return blocks
+
+
+def recorded_blocks(path: str) -> dict:
+    """
+    Loads every block a previous run saved, so runs against the real api can be replayed
+    :param path: path of a BlockStore sqlite file
+    :return: dict of height -> list of figment tx dicts
+    """
+    store = BlockStore(path)
+    blocks = {}
+
+    for height, data in store.conn.execute("SELECT height, data FROM blocks"):
+        blocks[height] = decode(data) or []
+
+    store.close()
+    return blocks
+
+
+def main():
+    parser = argparse.ArgumentParser(description="local stand-in for figment's transaction search")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every request")
+    parser.add_argument("--rate", type=float, default=0.0, help="requests per second before 429s, 0 for no limit")
+    parser.add_argument("--store", help="serve blocks recorded in a blocks.db instead of synthetic ones")
+    parser.add_argument("--first", type=int, default=3800000, help="first synthetic block")
+    parser.add_argument("--last", type=int, default=3816781, help="last synthetic block")
+    parser.add_argument("--liquidator", action="append", default=[], help="liquidator address for synthetic blocks")
+    args = parser.parse_args()
+
+    if args.store:
+        blocks = recorded_blocks(args.store)
+    else:
+        blocks = synthetic_blocks(args.first, args.last, args.liquidator or ["terra1liquidator"])
+
+    figment = FakeFigment(blocks, args.latency, args.rate, port=args.port)
+    print("serving " + str(len(blocks)) + " blocks at " + figment.url)
+    figment.server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
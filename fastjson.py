@@ -0,0 +1,28 @@
+import json
+
+try:
+    import orjson  # optional, parses stored blocks and execute messages several times faster
+except ImportError:
+    orjson = None
+
+
+def loads(data):
+    """
+    :param data: json as bytes or str
+    :return: parsed json, with orjson if it's installed
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+
+    return json.loads(data)
+
+
+def dumps(data) -> bytes:
+    """
+    :param data: json serializable data
+    :return: compact json as bytes, with orjson if it's installed
+    """
+    if orjson is not None:
+        return orjson.dumps(data)
+
+    return json.dumps(data, separators=(",", ":")).encode()
@@ -0,0 +1,449 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from queue import Full, Queue
+
+from block_cache import BlockCache
+from block_store import BlockStore
+from compact_block import CompactBlock, oracle_feeder, project_block
+from instrumentation import metrics
+from scheduler import RequestScheduler
+
+page_size = 100  # figment returns at most 100 txs per request
+missing = object()  # marks a block that isn't cached, None is a valid block
+max_height = 2**31 - 1  # before_height of the newest height search, past any real height
+tip_refresh = 6.0  # seconds the newest indexed height is trusted before it's asked for again (~ one block)
+
+
+class BlockFetcher:
+    """
+    Gets blocks and tx searches from figment through the request scheduler. Blocks are read
+    through block_cache and block_store, missing blocks are downloaded in parallel by prefetch.
+    Only blocks and searches of final heights, final_lag blocks behind the newest indexed height,
+    are stored, figment may still be indexing the newest blocks and a stored answer is never refreshed
+    """
+
+    def __init__(
+        self, scheduler: RequestScheduler, block_cache: BlockCache, block_store: BlockStore, final_lag: int = 1
+    ):
+        """
+        :param scheduler: sends requests to figment, its max_concurrency sizes the worker pool
+        :param block_cache: in memory cache of compact blocks
+        :param block_store: persistent store of full blocks
+        :param final_lag: blocks behind the newest indexed height that may still be missing txs
+        """
+        self.scheduler = scheduler
+        self.block_cache = block_cache
+        self.block_store = block_store
+        self.final_lag = final_lag
+        self.workers = scheduler.max_concurrency
+        self.pool = ThreadPoolExecutor(max_workers=self.workers)
+        self.oracle_index = None  # OracleIndex of the oracle feeder, lets checks skip blocks with no feed nearby
+        self.loading = {}  # height -> Future of a block get_block is reading or downloading
+        self.loading_lock = threading.Lock()
+        self.tip = block_store.get_tip()  # newest height figment has indexed, as far as known
+        self.tip_time = 0.0  # time.monotonic() when tip was last asked for
+        self.tip_lock = threading.Lock()
+
+    def post(self, data: dict) -> list:
+        """
+        :param data: transaction search request data
+        :return: list of txs
+        """
+        name = "get_block request" if "height" in data else "get_txs request"
+        with metrics.timer(name):
+            return self.scheduler.post(data)
+
+    def search(self, data: dict) -> list:
+        """
+        Transaction search read through block_store
+        :param data: transaction search request data
+        :return: list of txs
+        """
+        try:
+            tx_list = self.block_store.get_search(data)  # return page if searched by a previous run
+            metrics.count("search store hit")
+            return tx_list
+        except KeyError:
+            metrics.count("search store miss")
+
+        tx_list = self.post(data)
+        if self.is_final(data["before_height"]):
+            self.block_store.put_search(data, tx_list)
+        return tx_list
+
+    def latest_height(self) -> int:
+        """
+        The oracle feeder sends a tx every few blocks, so its newest tx is a cheap lower bound
+        of the newest indexed height. Posted past block_store, the answer changes as blocks arrive
+        :return: newest indexed height known
+        """
+        data = {
+            "network": "terra",
+            "before_height": max_height,
+            "after_height": self.tip + 1,
+            "sender": [oracle_feeder],
+            "offset": 0,
+            "limit": 1,
+        }
+        tx_list = self.post(data)
+
+        with self.tip_lock:
+            if tx_list and tx_list[0]["height"] > self.tip:
+                self.tip = tx_list[0]["height"]
+                self.block_store.put_tip(self.tip)  # later runs over stored heights don't ask again
+            self.tip_time = time.monotonic()
+
+        return self.tip
+
+    def final_height(self) -> int:
+        """
+        :return: highest height known to be final, every tx up to it is indexed
+        """
+        return self.tip - self.final_lag
+
+    def is_final(self, height: int) -> bool:
+        """
+        Asks for the newest indexed height again only if height is past the last answer, saved
+        in block_store by any run, and the answer is older than tip_refresh. Runs over old heights
+        ask at most once, reruns over stored heights not at all
+        :param height: int of block, or the before_height of a search
+        :return: true if what figment answers for height won't change any more
+        """
+        if height <= self.final_height():
+            return True
+        if time.monotonic() - self.tip_time > tip_refresh:
+            self.latest_height()
+
+        return height <= self.final_height()
+
+    def get_txs(self, sender: str, after_height: int, before_height: int, offset: int) -> list:
+        """
+        Uses figment.io transaction search to get the next 100 txs from sender based on offset
+        :param sender: str containing sender's address
+        :param after_height: gets txs after this height
+        :param before_height: gets txs before this height
+        :param offset: offset used because of figment's 100 tx limit
+        :return: list of txs
+        """
+        data = {
+            "network": "terra",
+            "before_height": before_height,
+            "after_height": after_height,
+            "sender": [sender],
+            "offset": offset,
+            "limit": page_size,
+        }
+        return self.search(data)
+
+    def get_all_txs(self, sender: str, after_height: int, before_height: int) -> list:
+        """
+        Pages through every tx from sender between after_height and before_height
+        :param sender: str containing sender's address
+        :param after_height: gets txs after this height
+        :param before_height: gets txs before this height
+        :return: list of txs in the order figment returns them
+        """
+        tx_list = []
+        offset = 0
+
+        while True:
+            page = self.get_txs(sender, after_height, before_height, offset)
+
+            if not page:
+                break
+
+            tx_list.extend(page)
+            offset += page_size  # change offset to get next 100 txs
+
+        return tx_list
+
+    def search_txs(self, sender: str, after_height: int, before_height: int, shards: int) -> list:
+        """
+        Same txs as get_all_txs, but the height range is split into shards that are paged
+        through at the same time. Neighbouring shards overlap by a couple of heights so no
+        height is missed whether figment's bounds are inclusive or not, the txs they share
+        are dropped by hash
+        :param sender: str containing sender's address
+        :param after_height: gets txs after this height
+        :param before_height: gets txs before this height
+        :param shards: number of shards to split the height range into
+        :return: list of txs, newest first like get_all_txs
+        """
+        futures = []
+        for shard_after, shard_before in shard_ranges(after_height, before_height, shards):
+            futures.append(self.pool.submit(self.get_all_txs, sender, shard_after, shard_before))
+
+        tx_list = []
+        seen = set()
+
+        for future in reversed(futures):  # newest shard first
+            for tx in future.result():
+                if tx["hash"] not in seen:
+                    seen.add(tx["hash"])
+                    tx_list.append(tx)
+
+        return tx_list
+
+    def iter_txs(self, sender: str, after_height: int, before_height: int, shards: int, queue_size: int = 16):
+        """
+        Yields the same txs as search_txs page by page as they arrive instead of waiting for
+        the whole search. Shards are paged through on their own threads at the same time, so
+        txs don't come in height order, and at most queue_size pages wait to be consumed
+        :param sender: str containing sender's address
+        :param after_height: gets txs after this height
+        :param before_height: gets txs before this height
+        :param shards: number of shards to split the height range into
+        :param queue_size: number of pages buffered ahead of the consumer
+        :return: generator of txs
+        """
+        ranges = shard_ranges(after_height, before_height, shards)
+        pages = Queue(queue_size)
+        stop = threading.Event()
+
+        overlap = set()  # heights two shards share, the only place a tx can arrive twice
+        for shard_after, shard_before in ranges[1:]:
+            overlap.update(range(shard_after, shard_after + 3))
+
+        def page_shard(shard_after: int, shard_before: int) -> None:
+            try:
+                offset = 0
+                while not stop.is_set():
+                    page = self.get_txs(sender, shard_after, shard_before, offset)
+
+                    if not page:
+                        break
+
+                    put_until(pages, page, stop)
+                    offset += page_size  # change offset to get next 100 txs
+            except Exception as e:  # hand the error to the consumer
+                put_until(pages, e, stop)
+            finally:
+                put_until(pages, None, stop)
+
+        shard_pool = ThreadPoolExecutor(max_workers=len(ranges))  # own threads, pages can block on a full queue
+        for shard_after, shard_before in ranges:
+            shard_pool.submit(page_shard, shard_after, shard_before)
+
+        seen = set()
+        finished = 0
+
+        try:
+            while finished < len(ranges):
+                page = pages.get()
+
+                if page is None:
+                    finished += 1
+                    continue
+                if isinstance(page, Exception):
+                    raise page
+
+                for tx in page:
+                    if tx["height"] in overlap:
+                        if tx["hash"] in seen:
+                            continue
+                        seen.add(tx["hash"])
+                    yield tx
+        finally:
+            stop.set()
+            shard_pool.shutdown(wait=False)
+
+    def get_block(self, height: int) -> CompactBlock:
+        """
+        Gets the specified block from figment tx search. Threads asking for a block another
+        thread is already loading wait for that load instead of downloading it again
+        :param height: int of block
+        :return: CompactBlock containing block
+        """
+        block = self.block_cache.get(height, missing)
+        if block is not missing:  # return block if already cached
+            metrics.count("cache hit")
+            return block
+
+        metrics.count("cache miss")
+        with self.loading_lock:
+            loading = self.loading.get(height)
+            if loading is None:
+                block = self.block_cache.get(height, missing)  # loaded since the first look
+                if block is not missing:
+                    return block
+                future = self.loading[height] = Future()
+
+        if loading is not None:
+            metrics.count("loading hit")
+            return loading.result()
+
+        try:
+            block = self.load_block(height)
+            future.set_result(block)
+            return block
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self.loading_lock:
+                del self.loading[height]
+
+    def load_block(self, height: int) -> CompactBlock:
+        """
+        :param height: int of block
+        :return: CompactBlock containing block, read from block_store or downloaded, and cached
+        """
+        try:
+            with metrics.timer("store read"):
+                stored = self.block_store[height]  # return block if downloaded by a previous run
+            metrics.count("store hit")
+            with metrics.timer("project block"):
+                block = project_block(stored)
+        except KeyError:
+            metrics.count("store miss")
+            block = self.save_block(height, self.join_pages(height, self.request_pages(height)))
+
+        self.block_cache[height] = block
+        return block
+
+    def prefetch(self, heights) -> int:
+        """
+        Downloads every block in heights that isn't cached or stored yet, keeping up to
+        4 blocks per worker in flight so memory stays flat however many heights are passed
+        :param heights: iterable of block heights
+        :return: number of blocks downloaded
+        """
+        to_fetch = sorted(h for h in set(heights) if h not in self.block_cache and h not in self.block_store)
+        window = 4 * self.workers
+        in_flight = deque()
+
+        for height in to_fetch:
+            in_flight.append((height, self.request_pages(height)))
+
+            if len(in_flight) >= window:
+                self.finish(*in_flight.popleft())
+
+        while in_flight:
+            self.finish(*in_flight.popleft())
+
+        metrics.count("prefetched blocks", len(to_fetch))
+        return len(to_fetch)
+
+    def request_page(self, height: int, offset: int) -> Future:
+        """
+        :param height: int of block
+        :param offset: offset of the page in the block
+        :return: future of the page
+        """
+        data = {"network": "terra", "height": height}
+        if offset:
+            data["offset"] = offset
+
+        return self.pool.submit(self.post, data)
+
+    def request_pages(self, height: int) -> deque:
+        """
+        Requests the first two pages of a block at the same time, the second page is only used
+        if the first one is full
+        :param height: int of block
+        :return: deque of (offset, page future), in flight
+        """
+        return deque([(0, self.request_page(height, 0)), (page_size, self.request_page(height, page_size))])
+
+    def join_pages(self, height: int, pages: deque) -> list:
+        """
+        Collects every page of a block in order. A full page means there may be another one, so
+        as each full page arrives the page after the one in flight is requested, one page is
+        always requested ahead of the page waited on. A short page ends the block and the
+        request ahead of it is dropped
+        :param height: int of block
+        :param pages: deque of (offset, page future) from request_pages
+        :return: list containing block
+        """
+        block = []
+
+        while True:
+            offset, page = pages.popleft()
+            page = page.result()
+            block.extend(page)
+
+            if offset == 2 * page_size and page:  # a block two pages can't hold
+                metrics.count("blocks over two pages")
+
+            if len(page) < page_size:
+                for _, ahead in pages:
+                    ahead.cancel()  # drop the page ahead if it hasn't been sent yet
+                return block
+
+            pages.append((offset + 2 * page_size, self.request_page(height, offset + 2 * page_size)))
+
+    def finish(self, height: int, pages: deque) -> None:
+        """
+        :param height: int of block
+        :param pages: deque of (offset, page future) from request_pages
+        """
+        self.block_cache[height] = self.save_block(height, self.join_pages(height, pages))
+
+    def save_block(self, height: int, block: list) -> CompactBlock:
+        """
+        Stores the full block if it's final and returns its projection, only the projection is kept
+        in memory. A block past the final height is downloaded again by the next run
+        :param height: int of block
+        :param block: list containing block
+        :return: CompactBlock containing block
+        """
+        if self.is_final(height):
+            with metrics.timer("store write"):
+                self.block_store[height] = block
+
+        with metrics.timer("project block"):
+            return project_block(block)
+
+    def close(self) -> None:
+        self.pool.shutdown(cancel_futures=True)
+        self.scheduler.close()
+
+
+def shard_edges(after_height: int, before_height: int, shards: int) -> list:
+    """
+    :param after_height: start of the height range
+    :param before_height: end of the height range
+    :param shards: number of shards wanted
+    :return: list of shard boundaries from after_height to before_height
+    """
+    shards = max(1, min(shards, (before_height - after_height) // 2))
+    step = (before_height - after_height) / shards
+    return [after_height + round(i * step) for i in range(shards)] + [before_height]
+
+
+def shard_ranges(after_height: int, before_height: int, shards: int) -> list:
+    """
+    Splits the height range into shards. Neighbouring shards overlap by a couple of heights
+    so no height is missed whether figment's bounds are inclusive or not
+    :param after_height: start of the height range
+    :param before_height: end of the height range
+    :param shards: number of shards wanted
+    :return: list of (after_height, before_height) tuples, oldest first
+    """
+    edges = shard_edges(after_height, before_height, shards)
+    ranges = []
+
+    for i in range(len(edges) - 1):
+        shard_after = edges[i] - 1 if i > 0 else after_height
+        shard_before = edges[i + 1] + 1 if i < len(edges) - 2 else before_height
+        ranges.append((shard_after, shard_before))
+
+    return ranges
+
+
+def put_until(queue: Queue, item, stop: threading.Event) -> None:
+    """
+    Puts item on a bounded queue, giving up once stop is set so producers
+    don't block forever when the consumer goes away
+    :param queue: queue to put item on
+    :param item: item to put
+    :param stop: event set when the consumer stops
+    """
+    while not stop.is_set():
+        try:
+            queue.put(item, timeout=1)
+            return
+        except Full:
+            continue
@@ -0,0 +1,174 @@
+import time
+
+from analysis import check_block, get_tx_liquidations
+from fetcher import BlockFetcher
+from instrumentation import metrics
+
+
+class RunningStats:
+    """
+    Totals and interval buckets of one liquidator's liquidations, updated in O(1) as every
+    checked block comes in instead of being rebuilt from the whole history
+    """
+
+    def __init__(self, origin: int, interval: int = 14400):
+        """
+        :param origin: height buckets are counted from, first_liq_block lines them up with the graphs
+        :param interval: blocks per bucket (~ one day)
+        """
+        self.origin = origin
+        self.interval = interval
+        self.total = 0
+        self.backrun = 0
+        self.frontrun = 0
+        self.buckets = {}  # bucket start -> [total, backrun, frontrun]
+
+    def bucket_start(self, height: int) -> int:
+        return self.origin + (height - self.origin) // self.interval * self.interval
+
+    def add(self, height: int, n: int, backrun: bool, frontrun: bool) -> None:
+        """
+        :param height: height of the liquidation block
+        :param n: liquidations in the block, they share its backrun and frontrun flags
+        :param backrun: true if the block's liquidations are backrun
+        :param frontrun: true if the block's liquidations are frontrun
+        """
+        bucket = self.buckets.setdefault(self.bucket_start(height), [0, 0, 0])
+        bucket[0] += n
+        self.total += n
+
+        if backrun:
+            bucket[1] += n
+            self.backrun += n
+        if frontrun:
+            bucket[2] += n
+            self.frontrun += n
+
+    def bucket(self, height: int) -> tuple:
+        """
+        :param height: any height in the bucket
+        :return: tuple of total, backrun and frontrun in the bucket
+        """
+        return tuple(self.buckets.get(self.bucket_start(height), (0, 0, 0)))
+
+    def graph_dict(self) -> dict:
+        """
+        :return: buckets in the graph dict format of generate_graph_data
+        """
+        return {
+            start: {"backrun": backrun, "normal": total - backrun}
+            for start, (total, backrun, frontrun) in sorted(self.buckets.items())
+        }
+
+
+class Follower:
+    """
+    Follows the chain as figment indexes new blocks and checks each one for the watched
+    liquidators with check_block. A block is only checked once the block after it is indexed,
+    so a liquidation at the end of a block is checked against the next block's first tx, and
+    the previous block is still in the block cache for one at the start. Nothing before the
+    first followed height is read
+    """
+
+    def __init__(
+        self,
+        liquidators: list,
+        fetcher: BlockFetcher,
+        first_height: int,
+        origin: int,
+        interval: int = 14400,
+        lag: int = 1,
+    ):
+        """
+        :param liquidators: list of watched liquidator addresses
+        :param fetcher: block fetcher, a small block cache is enough
+        :param first_height: first height to check, 0 starts at the newest indexed height
+        :param origin: height the stats buckets are counted from
+        :param interval: blocks per stats bucket (~ one day)
+        :param lag: blocks behind the newest indexed height that are left alone, in case figment
+                    hasn't indexed every tx of the newest blocks yet. At least the fetcher's final_lag,
+                    checked blocks are read back from its block store
+        """
+        self.fetcher = fetcher
+        self.lag = lag
+        self.tip = 0  # newest height figment has indexed
+        self.stats = {liquidator: RunningStats(origin, interval) for liquidator in liquidators}
+
+        if not first_height:
+            first_height = self.latest_height() - lag
+        self.next_height = first_height  # next height to check
+
+    def latest_height(self) -> int:
+        """
+        :return: newest indexed height known, see BlockFetcher.latest_height
+        """
+        self.tip = self.fetcher.latest_height()
+        return self.tip
+
+    def check_height(self, height: int) -> dict:
+        """
+        Checks one block for every watched liquidator with a liq tx in it and adds it to their stats
+        :param height: int of block
+        :return: dict of liquidator -> (liquidations, backrun, frontrun) for the liquidators in the block
+        """
+        block = self.fetcher.get_block(height)
+        metrics.count("followed blocks")
+        if not block:
+            return {}
+
+        senders = block.index.liquidators.keys() & self.stats.keys()
+        if not senders:
+            return {}
+
+        counts = dict.fromkeys(senders, 0)  # liquidate_collateral messages, counted like liquidator_stats
+        for tx in self.fetcher.block_store[height]:
+            for liquidation in get_tx_liquidations(tx):
+                if liquidation["sender"] in counts:
+                    counts[liquidation["sender"]] += 1
+
+        checked = {}
+        for liquidator, n in counts.items():
+            with metrics.timer("check block"):
+                backrun, frontrun = check_block(height, liquidator, self.fetcher)
+            self.stats[liquidator].add(height, n, backrun, frontrun)
+            checked[liquidator] = (n, backrun, frontrun)
+
+        return checked
+
+    def poll(self) -> list:
+        """
+        Checks every height that can be checked since the last poll, a window of blocks downloaded
+        in parallel at a time so a long catch up doesn't outgrow the block cache
+        :return: list of (height, dict returned by check_height) for the blocks with a watched liquidation
+        """
+        last_height = self.latest_height() - self.lag - 1  # the block after it has to be there too
+        window = 4 * self.fetcher.workers
+        checked = []
+
+        for window_start in range(self.next_height, last_height + 1, window):
+            window_end = min(window_start + window, last_height + 1)
+            self.fetcher.prefetch(range(window_start, window_end + 1))
+
+            for height in range(window_start, window_end):
+                block_checked = self.check_height(height)
+                if block_checked:
+                    checked.append((height, block_checked))
+
+            self.next_height = window_end
+
+        return checked
+
+    def follow(self, poll_interval: float = 6.0):
+        """
+        Polls forever, sleeping poll_interval seconds (~ one terra block) when there's nothing new
+        :param poll_interval: seconds between polls that found no new block
+        :return: generator of the lists returned by poll, every poll that checked a block
+        """
+        while True:
+            first_height = self.next_height
+            checked = self.poll()
+
+            if self.next_height != first_height:
+                yield checked
+            else:
+                time.sleep(poll_interval)
@@ -0,0 +1,96 @@
+from follow import Follower
+from instrumentation import profiling, report
+from runtime import open_fetcher
+
+apikeys = [""]  # requests are spread over every key, each with its own rate limit
+
+url_head = "https://terra--search.datahub.figment.io/apikey/"
+url_tail = "/transactions_search"
+urls = [url_head + apikey + url_tail for apikey in apikeys]
+
+cache_bytes = 16 * 1024 * 1024  # memory budget for cached blocks, only the newest few are read again
+fetch_workers = 16  # most requests to figment in flight at once, fewer are used while latency or errors go up
+request_rate = 0  # requests per second allowed per api key, 0 for no limit
+poll_interval = 6  # seconds between polls for new blocks when the last poll found none (~ one block)
+follow_lag = 1  # blocks behind the newest indexed height that are left alone until figment has all their txs
+metrics_path = ""  # write the run metrics as json to this path when stopped, empty to only print them
+profile_cpu = False  # run cProfile on the main thread and print the top functions
+profile_memory = False  # run tracemalloc and print the top allocations
+
+first_liq_block = 2287317  # daily buckets are counted from here, like the liquidator_stats graphs
+first_block = 0  # first height to follow from, 0 starts at the newest block
+interval = 14400  # blocks per bucket (~ one day)
+
+liquidators = [
+    "terra18kgwjqrm7mcnlzcy7l8h7awnn7fs2pvdl2tpm9",
+    "terra13wg8aj26kvzu2q0xwthkttwul4ud72t6y6z92r",
+    "terra1dx8p5gkegpcamny5emt0z069cm6ekjuwxhqgdg",
+    "terra1gcvztv0gmzqgyy0ae7v7v3rt0ggzktup9qzdnv",
+    "terra14s9r9u67tjy5yk7v6m6056qsh2jg2lpzhmzvg5",
+    "terra1v9l5hz9euqzm0hg4quh2gs32n9y99q9c4yhqqs",
+    "terra1t58pt7mgj30cgm682zn3s4rykvxa9p7t0jl0xm",
+    "terra1c0zj6xp7uzgctf2lqhthkdty828m29zyjdawd0",
+    "terra1swt4gfylaq02tsek3gunevyuwp2egtukhwrs4q",
+    "terra14l56n89zmf4km5m3xj7tq7p9f2w7zq6v2ly0xq",
+]
+
+
+def print_update(height: int, liquidator: str, checked: tuple, follower: Follower) -> None:
+    """
+    Prints a liquidation block as it's checked, with the liquidator's running and daily stats
+    :param height: height of the liquidation block
+    :param liquidator: str containing liquidator's address
+    :param checked: tuple of liquidations, backrun and frontrun of the block
+    :param follower: follower holding the stats
+    """
+    n, backrun, frontrun = checked
+    stats = follower.stats[liquidator]
+    day_total, day_backrun, day_frontrun = stats.bucket(height)
+
+    flags = [name for name, flag in (("backrun", backrun), ("frontrun", frontrun)) if flag]
+    print(
+        "%d %s %d liquidations %s | total %d backrun %d frontrun %d | day %d backrun %d frontrun %d"
+        % (
+            height,
+            liquidator,
+            n,
+            ",".join(flags) or "normal",
+            stats.total,
+            stats.backrun,
+            stats.frontrun,
+            day_total,
+            day_backrun,
+            day_frontrun,
+        )
+    )
+
+
+def main():
+    """
+    Follows new blocks until stopped with ctrl-c and prints every watched liquidation as it's checked
+    """
+    block_fetcher = open_fetcher(urls, request_rate, fetch_workers, cache_bytes, final_lag=follow_lag)
+    follower = Follower(liquidators, block_fetcher, first_block, first_liq_block, interval, follow_lag)
+    print("following from " + str(follower.next_height))
+
+    try:
+        for checked in follower.follow(poll_interval):
+            for height, block_checked in checked:
+                for liquidator, liquidator_checked in block_checked.items():
+                    print_update(height, liquidator, liquidator_checked, follower)
+            print("checked up to " + str(follower.next_height - 1))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        block_fetcher.close()
+
+    report(metrics_path)
+
+
+if __name__ == "__main__":
+    if "" in apikeys:
+        print("figment.io apikey missing")
+        quit()
+
+    with profiling(profile_cpu, profile_memory):
+        main()
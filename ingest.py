@@ -0,0 +1,118 @@
+import codecs
+import json
+import re
+
+chunk_size = 64 * 1024  # bytes read from a response at a time
+decoder = json.JSONDecoder()
+whitespace = re.compile(r"[ \t\n\r]*")
+
+
+def slim_tx(tx: dict) -> dict:
+    """
+    Keeps the fields of a figment tx that project_tx, get_tx_liquidations and the searches read,
+    the rest of a tx (logs, fees, raw data, the other events) is most of its size
+    :param tx: figment tx dict
+    :return: tx dict with the same layout, only the read fields are left
+    :raise ValueError: if tx isn't a dict
+    """
+    if not isinstance(tx, dict):
+        raise ValueError("tx isn't a json object")
+
+    slim = {"hash": tx.get("hash"), "height": tx.get("height")}
+
+    try:
+        event = tx["events"][0]
+        sub = event["sub"][0]
+    except (KeyError, IndexError, TypeError):  # keep what's there, project_tx decides what it means
+        slim["events"] = tx.get("events", [])[:1]
+        return slim
+
+    slim_sub = {}
+    if "sender" in sub:
+        slim_sub["sender"] = sub["sender"][:1]
+    if event.get("kind") == "execute_contract" and "additional" in sub:
+        slim_sub["additional"] = {"execute_message": sub["additional"].get("execute_message", [])}
+
+    slim["events"] = [{"kind": event.get("kind"), "sub": [slim_sub]}]
+    return slim
+
+
+def iter_array(chunks):
+    """
+    Yields the items of a json array as each one is complete, while the rest of the body is still
+    arriving. Only the item being parsed and the chunk it's in are held, never the whole body.
+    A null or other empty body yields nothing, like an empty array
+    :param chunks: iterable of bytes, e.g. Response.iter_content
+    :return: generator of the array's items
+    :raise ValueError: if the body isn't a single json array or empty value, or ends early
+    """
+    text_decoder = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    pos = 0
+    state = "start"  # start, value (not a list), first (item or ]), item, next (, or ]), end
+
+    def parse(final: bool):
+        nonlocal pos, state
+
+        while True:
+            pos = whitespace.match(buffer, pos).end()
+            if pos == len(buffer):
+                return
+
+            char = buffer[pos]
+            if state == "start":
+                state = "first" if char == "[" else "value"
+                pos += char == "["
+            elif state == "value":  # figment answers an empty page with null at times
+                if not final:
+                    return  # read the whole body before deciding
+                value, pos = decoder.raw_decode(buffer, pos)
+                if value:
+                    raise ValueError("body isn't a json list")
+                state = "end"
+            elif state in ("first", "next") and char == "]":
+                state = "end"
+                pos += 1
+            elif state == "next":
+                if char != ",":
+                    raise ValueError("expected , or ] at " + repr(buffer[pos : pos + 20]))
+                state = "item"
+                pos += 1
+            elif state in ("first", "item"):
+                try:
+                    item, end = decoder.raw_decode(buffer, pos)
+                except ValueError:
+                    if final:
+                        raise
+                    return  # the item goes on in the next chunk
+
+                following = whitespace.match(buffer, end).end()
+                if not final and (following == len(buffer) or buffer[following] not in ",]"):
+                    return  # a number cut short at the chunk's end, e.g. 6. of 6.5e3, could go on in the next chunk
+
+                yield item
+                state = "next"
+                pos = end
+            else:
+                raise ValueError("data after the json list")
+
+    for chunk in chunks:
+        buffer = buffer[pos:] + text_decoder.decode(chunk)
+        pos = 0
+        yield from parse(False)
+
+    buffer = buffer[pos:] + text_decoder.decode(b"", final=True)
+    pos = 0
+    yield from parse(True)
+
+    if state != "end":
+        raise ValueError("body ended before the json list did")
+
+
+def read_txs(chunks) -> list:
+    """
+    :param chunks: iterable of bytes of a transaction search response
+    :return: list of slimmed txs
+    :raise ValueError: if the body isn't a single json list
+    """
+    return [slim_tx(tx) for tx in iter_array(chunks)]
@@ -0,0 +1,202 @@
+import bisect
+import contextlib
+import cProfile
+import json
+import pstats
+import threading
+import time
+import tracemalloc
+
+bucket_bounds = [0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1, 2, 5, 10, 30, 60]  # seconds
+
+
+class Histogram:
+    """
+    Latency histogram with fixed log spaced buckets, percentiles are the upper bound
+    of the bucket they fall in
+    """
+
+    def __init__(self):
+        self.buckets = [0] * (len(bucket_bounds) + 1)  # last bucket is everything above the last bound
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds: float) -> None:
+        self.buckets[bisect.bisect_left(bucket_bounds, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def merge(self, timing: dict) -> None:
+        """
+        :param timing: dict from to_dict of another histogram, e.g. from a worker process
+        """
+        for i, n in enumerate(timing["buckets"].values()):
+            self.buckets[i] += n
+        self.count += timing["count"]
+        self.total += timing["total"]
+        self.max = max(self.max, timing["max"])
+
+    def percentile(self, p: float) -> float:
+        """
+        :param p: percentile between 0 and 100
+        :return: upper bound in seconds of the bucket holding the percentile
+        """
+        rank = p / 100 * self.count
+        seen = 0
+
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if seen >= rank and n:
+                return min(bucket_bounds[i], self.max) if i < len(bucket_bounds) else self.max
+
+        return 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "total": self.total,
+            "mean": self.total / self.count if self.count else 0.0,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+            "max": self.max,
+            "buckets": dict(zip([str(bound) for bound in bucket_bounds] + ["inf"], self.buckets)),
+        }
+
+
+class Metrics:
+    """
+    Counters and latency histograms for a run, shared by every module through the
+    metrics instance below. Safe to update from any thread
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self.lock:
+            self.counters = {}
+            self.timings = {}
+            self.started = time.perf_counter()
+
+    def count(self, name: str, n: int = 1) -> None:
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def record(self, name: str, seconds: float) -> None:
+        with self.lock:
+            if name not in self.timings:
+                self.timings[name] = Histogram()
+            self.timings[name].add(seconds)
+
+    @contextlib.contextmanager
+    def timer(self, name: str):
+        """
+        Records the time spent in the with block under name
+        :param name: str of the timing
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def merge(self, summary: dict) -> None:
+        """
+        Adds the counters and timings of another run, e.g. from a worker process
+        :param summary: dict from to_dict
+        """
+        with self.lock:
+            for name, value in summary["counters"].items():
+                self.counters[name] = self.counters.get(name, 0) + value
+            for name, timing in summary["timings"].items():
+                if name not in self.timings:
+                    self.timings[name] = Histogram()
+                self.timings[name].merge(timing)
+
+    def hit_ratio(self, name: str) -> float:
+        """
+        :param name: prefix of a "<name> hit" and "<name> miss" counter pair
+        :return: hits / (hits + misses), 0 if neither was counted
+        """
+        hits = self.counters.get(name + " hit", 0)
+        misses = self.counters.get(name + " miss", 0)
+        return hits / (hits + misses) if hits + misses else 0.0
+
+    def to_dict(self) -> dict:
+        with self.lock:
+            return {
+                "wall_seconds": time.perf_counter() - self.started,
+                "counters": dict(self.counters),
+                "cache_hit_ratio": self.hit_ratio("cache"),
+                "store_hit_ratio": self.hit_ratio("store"),
+                "timings": {name: histogram.to_dict() for name, histogram in self.timings.items()},
+            }
+
+    def print_summary(self) -> None:
+        summary = self.to_dict()
+
+        print("")
+        print("Run metrics, " + "%.1f" % summary["wall_seconds"] + "s wall time")
+        for name, value in sorted(summary["counters"].items()):
+            print("  %-40s %d" % (name, value))
+        print("  %-40s %.1f%%" % ("cache hit ratio", summary["cache_hit_ratio"] * 100))
+        print("  %-40s %.1f%%" % ("store hit ratio", summary["store_hit_ratio"] * 100))
+
+        print("  %-40s %8s %10s %8s %8s %8s" % ("timing", "count", "total s", "mean ms", "p95 ms", "max ms"))
+        for name, timing in sorted(summary["timings"].items()):
+            mean, p95, slowest = timing["mean"] * 1000, timing["p95"] * 1000, timing["max"] * 1000
+            print("  %-40s %8d %10.2f %8.1f %8.1f %8.1f" % (name, timing["count"], timing["total"], mean, p95, slowest))
+
+    def write_json(self, path: str) -> None:
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+
+metrics = Metrics()
+
+
+def report(path: str = "") -> None:
+    """
+    Prints the run summary and optionally writes it as json
+    :param path: path to write the metrics json to, empty to only print
+    """
+    metrics.print_summary()
+    if path:
+        metrics.write_json(path)
+
+
+@contextlib.contextmanager
+def profiling(cpu: bool = False, memory: bool = False, top: int = 25):
+    """
+    Opt-in deep profiling of the with block. cpu runs cProfile on the calling thread and saves
+    the stats to profile.out, memory runs tracemalloc over every thread, both print their top lines
+    :param cpu: profile cpu time with cProfile
+    :param memory: trace allocations with tracemalloc
+    :param top: number of lines to print
+    """
+    profiler = cProfile.Profile() if cpu else None
+    if memory:
+        tracemalloc.start()
+    if profiler:
+        profiler.enable()
+
+    try:
+        yield
+    finally:
+        if profiler:
+            profiler.disable()
+            profiler.dump_stats("profile.out")
+            pstats.Stats(profiler).sort_stats("cumulative").print_stats(top)
+
+        if memory:
+            snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            print("Traced memory: %.1fMB current, %.1fMB peak" % (current / 1024 / 1024, peak / 1024 / 1024))
+            for stat in snapshot.statistics("lineno")[:top]:
+                print(stat)
@@ -0,0 +1,212 @@
+import argparse
+import os
+import socket
+import threading
+import time
+
+import liquidator_stats
+from analysis import check_liquidations, plan_fetches
+from checkpoint import get_chunk_liq_txs
+from export import flatten_liquidation
+from fetcher import BlockFetcher
+from instrumentation import metrics, profiling, report
+from work_queue import WorkQueue
+
+queue_file = "work.db"  # path of the work queue, on storage every host can reach
+unit_blocks = 100800  # blocks of one liquidator in a work unit (~ one week)
+lease_seconds = 600  # a unit whose worker hasn't renewed its lease for this long is handed to another worker
+poll_interval = 10  # seconds an idle worker waits before asking again while other workers hold the last units
+max_attempts = 3  # claims of a unit, failed or with a lease that ran out, before it's marked failed and skipped
+
+
+def run_name() -> str:
+    """
+    :return: name of the run set up in liquidator_stats, units of another height range are a different run
+    """
+    return str(liquidator_stats.first_liq_block) + "-" + str(liquidator_stats.last_liq_block)
+
+
+def coordinate(queue: WorkQueue) -> None:
+    """
+    Splits the run into a unit per liquidator and unit_blocks heights and queues the units
+    that aren't queued yet. Failed units get their attempts back
+    :param queue: work queue
+    """
+    first_height = liquidator_stats.first_liq_block
+    last_height = liquidator_stats.last_liq_block
+    units = []
+
+    for liquidator in liquidator_stats.liquidators:
+        for after_height in range(first_height, last_height, unit_blocks):
+            units.append((liquidator, after_height, min(after_height + unit_blocks, last_height)))
+
+    added = queue.add_units(run_name(), units)
+    print("Queued " + str(added) + " of " + str(len(units)) + " units for run " + run_name())
+
+    reset = queue.reset_failed(run_name())
+    if reset:
+        print("Reset " + str(reset) + " failed units for another " + str(max_attempts) + " attempts")
+
+
+def run_unit(liquidator: str, after_height: int, before_height: int, fetcher: BlockFetcher) -> list:
+    """
+    Searches and checks the liquidations of liquidator after after_height up to and including
+    before_height, the same way update_checkpoints checks a chunk
+    :param liquidator: str containing liquidator's address
+    :param after_height: last height before the unit
+    :param before_height: last height of the unit
+    :param fetcher: block fetcher
+    :return: checked liquidations, flattened
+    """
+    shards = liquidator_stats.search_shards
+
+    liquidation_list = get_chunk_liq_txs(
+        liquidator, liquidator_stats.first_liq_block, after_height, before_height, shards, fetcher
+    )
+    if fetcher.oracle_index is not None:  # feeds around every liquidation block of the unit
+        fetcher.oracle_index.cover(after_height - 1, before_height + 1, shards, fetcher)
+
+    plan_fetches({liquidator: liquidation_list}, fetcher)
+    check_liquidations(liquidation_list, liquidator, fetcher)
+
+    return [flatten_liquidation(liquidation) for liquidation in liquidation_list]
+
+
+def keep_leased(queue: WorkQueue, unit_id: int, owner: str, stop: threading.Event) -> None:
+    """
+    Renews the lease of a unit every third of lease_seconds until stop is set
+    """
+    while not stop.wait(lease_seconds / 3):
+        if not queue.renew(unit_id, owner, lease_seconds):
+            return  # the unit was handed to another worker, this one finishes it anyway
+
+
+def work(queue: WorkQueue, fetcher: BlockFetcher) -> None:
+    """
+    Claims and runs units until every unit of the run is done or failed. Start as many workers
+    as the hosts and api keys allow, each in its own process with its own blocks.db. A unit that
+    raises is freed for another attempt, and marked failed after max_attempts
+    :param queue: work queue
+    :param fetcher: block fetcher, from liquidator_stats.open_run
+    """
+    run = run_name()
+    owner = socket.gethostname() + ":" + str(os.getpid())
+    finished = 0
+
+    while True:
+        unit = queue.claim(run, owner, lease_seconds, max_attempts)
+
+        if unit is None:
+            progress = queue.progress(run)
+            if progress["done"] + progress["failed"] == progress["total"]:
+                break
+            time.sleep(poll_interval)  # the units left are leased, wait in case a worker dies
+            continue
+
+        unit_id, liquidator, after_height, before_height = unit
+        unit_name = liquidator + " " + str(after_height + 1) + " to " + str(before_height)
+        stop = threading.Event()
+        threading.Thread(target=keep_leased, args=(queue, unit_id, owner, stop), daemon=True).start()
+
+        metrics.reset()  # the unit's metrics are saved with its result for the reducer
+        try:
+            with metrics.timer("liquidator " + liquidator):
+                liquidation_list = run_unit(liquidator, after_height, before_height, fetcher)
+        except Exception as e:  # recorded in the queue, the next unit may work
+            failed = queue.fail(unit_id, repr(e), max_attempts)
+            print("Unit " + unit_name + " " + ("failed: " if failed else "will be retried: ") + repr(e))
+            continue
+        finally:
+            stop.set()
+
+        queue.complete(unit_id, liquidation_list, metrics.to_dict())
+        finished += 1
+        print("Unit " + unit_name + ": " + str(len(liquidation_list)) + " liquidations")
+
+    print("No units left, " + str(finished) + " run by " + owner)
+    print_failures(queue)
+
+
+def print_failures(queue: WorkQueue) -> None:
+    """
+    :param queue: work queue
+    """
+    for liquidator, after_height, before_height, attempts, error in queue.failures(run_name()):
+        unit_name = liquidator + " " + str(after_height + 1) + " to " + str(before_height)
+        print("Failed unit " + unit_name + " after " + str(attempts) + " attempts: " + str(error))
+
+
+def status(queue: WorkQueue) -> None:
+    """
+    :param queue: work queue
+    """
+    progress = queue.progress(run_name())
+    counts = [str(progress[key]) + " " + key for key in ("done", "failed", "leased")]
+    print("Run " + run_name() + ": " + str(progress["total"]) + " units, " + ", ".join(counts), end="")
+    print(", " + str(progress["retried"]) + " claimed more than once")
+    print_failures(queue)
+
+
+def reduce_results(queue: WorkQueue) -> None:
+    """
+    Merges the results of every unit into the report, graphs and export liquidator_stats makes
+    :param queue: work queue
+    """
+    run = run_name()
+    progress = queue.progress(run)
+    if progress["total"] == 0 or progress["done"] < progress["total"]:
+        status(queue)
+        if progress["failed"]:
+            print("Fix the errors and run coordinate again to retry the failed units")
+        return
+
+    graphs = {}
+    exported = []
+
+    for liquidator in queue.liquidators(run):
+        liquidation_list, summaries = queue.results(run, liquidator)
+        for summary in summaries:
+            metrics.merge(summary)
+
+        graphs[liquidator] = liquidator_stats.generate_graph_data(
+            liquidation_list, liquidator_stats.first_liq_block, liquidator_stats.last_liq_block
+        )
+        liquidator_stats.liquidator_stats(liquidation_list, liquidator)
+        if liquidator_stats.export_path:
+            exported.extend(liquidation_list)
+
+    liquidator_stats.graph_all(graphs)
+    liquidator_stats.export_liquidations(exported)
+    report(liquidator_stats.metrics_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="runs liquidator_stats as work units on any number of hosts")
+    parser.add_argument(
+        "role",
+        choices=["coordinate", "work", "status", "reduce"],
+        help="coordinate queues the run set up in liquidator_stats.py, work runs units until none are left, "
+        "reduce prints the report once every unit is done",
+    )
+    parser.add_argument("--queue", default=queue_file, help="path of the work queue")
+    args = parser.parse_args()
+
+    if args.role == "work" and "" in liquidator_stats.apikeys:
+        print("figment.io apikey missing")
+        return
+
+    queue = WorkQueue(args.queue)
+    if args.role == "work":
+        fetcher, checkpoints = liquidator_stats.open_run(liquidator_stats.settings())
+        work(queue, fetcher)
+        fetcher.close()
+        checkpoints.close()
+    else:
+        roles = {"coordinate": coordinate, "status": status, "reduce": reduce_results}
+        roles[args.role](queue)
+    queue.close()
+
+
+if __name__ == "__main__":
+    with profiling(liquidator_stats.profile_cpu, liquidator_stats.profile_memory):
+        main()
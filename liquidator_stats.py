@@ -1,375 +1,389 @@
-import base64
-import json
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 
-import matplotlib.pyplot as plt
-import numpy as np
-from requests import Session
+from analysis import print_fetch_plan
+from charts import ChartRenderer, render_graphs
+from checkpoint import Checkpoints, update_checkpoints
+from export import flatten_liquidation, write_columns
+from fetcher import BlockFetcher
+from instrumentation import metrics, profiling, report
+from pipeline import stream_liquidations
+from runtime import open_fetcher
+from stats import LiquidationStats
 
-apikey = ""
+apikeys = [""]  # requests are spread over every key, each with its own rate limit
 
 url_head = "https://terra--search.datahub.figment.io/apikey/"
 url_tail = "/transactions_search"
-url = url_head + apikey + url_tail
-
-block_cache = {}
-headers = {"content-type": "application/json"}
-oracle_feeder = "terra1zue382qey9l5uhhwcwumjhmsne49a0agwhd60d"
+urls = [url_head + apikey + url_tail for apikey in apikeys]
+
+cache_bytes = 1024 * 1024 * 1024  # memory budget for cached blocks
+cache_compress = False  # keep cached blocks compressed, uses less memory but more cpu
+fetch_workers = 16  # most requests to figment in flight at once, fewer are used while latency or errors go up
+request_rate = 0  # requests per second allowed per api key, 0 for no limit
+search_shards = 16  # height ranges a liquidator's txs are searched in at the same time
+checkpoint_interval = 100800  # blocks searched and checked between checkpoints (~ one week)
+metrics_path = ""  # write the run metrics as json to this path, empty to only print them
+profile_cpu = False  # run cProfile on the main thread and print the top functions
+profile_memory = False  # run tracemalloc and print the top allocations
+use_oracle_index = True  # search the oracle feeder's txs once and skip blocks with no price_feed tx nearby
+streaming = False  # search, download and check each liquidator at the same time instead of planning all fetches first
+processes = 0  # liquidators handled at the same time by worker processes, 0 handles them one by one in this process
+chart_dpi = 600  # resolution of the png graphs, 150 renders several times faster
+chart_format = "png"  # "png" or "svg"
+chart_panels = False  # save one liquidators.png with a panel per liquidator instead of a graph each
+chart_workers = 0  # processes rendering graphs at the same time, 0 renders them in this process
+export_path = ""  # directory to write every checked liquidation to as numpy columns, empty to skip
+
+worker = None  # tuple of settings, block fetcher, checkpoints and chart renderer of a worker process
 
 first_liq_block = 2287317
 last_liq_block = 3816781
 suspect_activity_block = 3757709
 
-
-def get_block(height: int, s: Session) -> list:
-    """
-    Gets the specified block from figment tx search
-    :param height: int of block
-    :param s: session
-    :return: list containing block
-    """
-    if height in block_cache:  # return block if already cached
-        return block_cache[height]
-
-    data = {"network": "terra", "height": height}
-
-    res = s.post(url, data=json.dumps(data), headers=headers)
-    block = res.json()
-
-    if block:
-        if len(block) == 100:
-            data = {"network": "terra", "height": height, "offset": 100}
-            res = s.post(url, data=json.dumps(data), headers=headers)
-            if res.json():
-                for tx in res.json():
-                    block.append(tx)
-
-    block_cache[height] = block  # cache block to reduce api requests
-    return block
-
-
-def get_msg_list(tx: dict) -> list:
-    """
-    Takes a tx dict, decodes and returns the msg list
-    :param tx: tx dict
-    :return: decoded msg list
-    """
-    decoded_msg_list = []
-    msg_list = tx["events"][0]["sub"][0]["additional"]["execute_message"]
-    for msg in msg_list:
-        decoded_msg = json.loads(base64.b64decode(msg))
-        decoded_msg_list.append(decoded_msg)
-
-    return decoded_msg_list
-
-
-def get_txs(sender: str, after_height: int, before_height: int, offset: int, s: Session) -> list:
-    """
-    Uses figment.io transaction search to get thne next 100 txs from sender based on offset
-    :param sender: str containing sender's address
-    :param after_height: gets txs after this height
-    :param before_height: gets txs before this height
-    :param offset: offset used because of figment's 100 tx limit
-    :param s: session
-    :return:
-    """
-    limit = 100
-    data = {
-        "network": "terra",
-        "before_height": before_height,
-        "after_height": after_height,
-        "sender": [sender],
-        "offset": offset,
-        "limit": limit,
-    }
-    res = s.post(url, data=json.dumps(data), headers=headers)
-    return res.json()
-
-
-def check_tx_type(tx: dict, kind: str) -> bool:
-    """
-    :param tx: transaction dictionary
-    :param kind: string containing tx type
-    :return: boolean
-    """
-    if tx["events"][0]["kind"] == kind:
-        return True
-
-    return False
-
-
-def check_sender(tx: dict, sender: str) -> bool:
-    """
-    :param tx: transaction dictionary
-    :param sender: string containing sender's address
-    :return: boolean
-    """
-    if tx["events"][0]["sub"][0]["sender"][0]["account"]["id"] == sender:
-        return True
-
-    return False
-
-
-def get_sender(tx: dict) -> str:
-    """
-    Returns the tx sender's address
-    :param tx: transaction dictionary
-    :return: str
-    """
-    return tx["events"][0]["sub"][0]["sender"][0]["account"]["id"]
+liquidators = [
+    "terra18kgwjqrm7mcnlzcy7l8h7awnn7fs2pvdl2tpm9",
+    "terra13wg8aj26kvzu2q0xwthkttwul4ud72t6y6z92r",
+    "terra1dx8p5gkegpcamny5emt0z069cm6ekjuwxhqgdg",
+    "terra1gcvztv0gmzqgyy0ae7v7v3rt0ggzktup9qzdnv",
+    "terra14s9r9u67tjy5yk7v6m6056qsh2jg2lpzhmzvg5",
+    "terra1v9l5hz9euqzm0hg4quh2gs32n9y99q9c4yhqqs",
+    "terra1t58pt7mgj30cgm682zn3s4rykvxa9p7t0jl0xm",
+    "terra1c0zj6xp7uzgctf2lqhthkdty828m29zyjdawd0",
+    "terra1swt4gfylaq02tsek3gunevyuwp2egtukhwrs4q",
+    "terra14l56n89zmf4km5m3xj7tq7p9f2w7zq6v2ly0xq",
+]
 
 
 def liquidator_stats(liquidation_attempts: list, liquidator: str) -> None:
     """
-    Takes a liquidation list and finds the number of txs that are backrun,
+    Takes a liquidation list and finds the number of txs that are backrun and frontrun,
     stats are seperated before and after suspect block activity
     :param liquidation_attempts: list
     :param liquidator: str
     """
-    before_total = 0
-    before_backrun = 0
-    after_total = 0
-    after_backrun = 0
-
-    for liquidation in liquidation_attempts:
-        if liquidation["height"] < suspect_activity_block:
-            before_total += 1
-            if liquidation["backrun"]:
-                before_backrun += 1
-        else:
-            after_total += 1
-            if liquidation["backrun"]:
-                after_backrun += 1
+    stats = LiquidationStats(liquidation_attempts)
+    before, after = stats.splits([suspect_activity_block], first_liq_block, last_liq_block + 1)
+    before_total, before_backrun, before_frontrun = [int(count[0]) for count in before]
+    after_total, after_backrun, after_frontrun = [int(count[0]) for count in after]
 
     print("")
     print(liquidator)
     print(str(first_liq_block) + " to " + str(suspect_activity_block) + ":")
-    print("Total: " + str(before_total))
-    print("Backrun: " + str(before_backrun))
-    if before_total > 0:
-        print("Percent backrun: " + str(before_backrun / before_total * 100) + "%")
-    else:
-        print("Percent backrun: 0%")
+    print_period_stats(before_total, before_backrun, before_frontrun)
     print("")
 
     print(str(suspect_activity_block) + " to " + str(last_liq_block) + ":")
-    print("Total: " + str(after_total))
-    print("Backrun: " + str(after_backrun))
-    if after_total > 0:
-        print("Percent backrun: " + str(after_backrun / after_total * 100) + "%")
+    print_period_stats(after_total, after_backrun, after_frontrun)
+
+
+def print_period_stats(total: int, backrun: int, frontrun: int) -> None:
+    """
+    :param total: number of liquidation attempts in the period
+    :param backrun: number of them that are backrun
+    :param frontrun: number of them that are frontrun
+    """
+    print("Total: " + str(total))
+    print("Backrun: " + str(backrun))
+    if total > 0:
+        print("Percent backrun: " + str(backrun / total * 100) + "%")
     else:
         print("Percent backrun: 0%")
+    print("Frontrun: " + str(frontrun))
+    if total > 0:
+        print("Percent frontrun: " + str(frontrun / total * 100) + "%")
+    else:
+        print("Percent frontrun: 0%")
 
 
-def generate_graph_data(liquidation_list: list) -> dict:
+def generate_graph_data(liquidation_list: list, first_height: int, last_height: int) -> dict:
     """
     Generates graph data from liquidation list, txs every
     14400 blocks (~ one day) are grouped togather
     :param liquidation_list: list
+    :param first_height: first height of the graph, first_liq_block
+    :param last_height: last height of the graph, last_liq_block
     :return: dictionary containing graph data
     """
     graph_dict = {}
     interval = 14400
-    block = first_liq_block
-
-    for i in range(first_liq_block, last_liq_block, interval):
-        graph_dict[i] = {"backrun": 0, "normal": 0}
 
-    for liquidation in reversed(liquidation_list):
-        height = liquidation["height"]
+    stats = LiquidationStats(liquidation_list)
+    bucket_starts, backrun, normal = stats.histogram(first_height, last_height, interval)
 
-        if height > block + interval:
-            block = block + interval
-
-        if liquidation["backrun"]:
-            graph_dict[block]["backrun"] += 1
-        else:
-            graph_dict[block]["normal"] += 1
+    for i in range(len(bucket_starts)):
+        graph_dict[int(bucket_starts[i])] = {"backrun": int(backrun[i]), "normal": int(normal[i])}
 
     return graph_dict
 
 
-def plot_graph(graph_dict: dict, liquidator: str) -> None:
+def plot_graph(graph_dict: dict, liquidator: str, chart_renderer: ChartRenderer) -> None:
     """
-    Generates graph from graph_dict and saves to disk
+    Generates graph from graph_dict and saves to disk, on the figure chart_renderer reuses
     :param graph_dict: dictionary containing graph data
     :param liquidator: string
+    :param chart_renderer: renderer of the process
     """
-    labels, backrun, normal = [], [], []
+    chart_renderer.render(graph_dict, liquidator)
+
 
-    for key, val in graph_dict.items():
-        labels.append(key)
-        backrun.append(val["backrun"])
-        normal.append(val["normal"])
+def graph_all(graphs: dict) -> None:
+    """
+    Saves the graphs of every liquidator in one batch, as set by the chart settings
+    :param graphs: dict of liquidator -> graph dict from generate_graph_data
+    """
+    with metrics.timer("plot graphs"):
+        render_graphs(graphs, chart_dpi, chart_format, chart_panels, chart_workers)
 
-    x_axis = np.arange(len(labels))
 
-    plt.figure()
-    plt.title(liquidator)
-    plt.xlabel("Height")
-    plt.ylabel("Liquidation Attempts")
+def create_liquidation_list(
+    liquidator: str, config: dict, block_fetcher: BlockFetcher, checkpoints: Checkpoints
+) -> list:
+    """
+    This method searches and checks the liquidations from liquidator after its last checkpoint,
+    then loads every checked liquidation in the range from the checkpoints
+    :param liquidator: str contaiining the liquidator's address
+    :param config: dict from settings
+    :param block_fetcher: block fetcher from open_run
+    :param checkpoints: checkpoints from open_run
+    :return: liquidation list that has been checked for backrunning and frontrunning
+    """
+    first_height = config["first_liq_block"]
+    last_height = config["last_liq_block"]
+    update_checkpoints(
+        [liquidator],
+        first_height,
+        last_height,
+        config["checkpoint_interval"],
+        config["search_shards"],
+        block_fetcher,
+        checkpoints,
+    )
+
+    return checkpoints.load(liquidator, first_height, last_height)
+
+
+def stream_liquidation_list(liquidator: str, config: dict, block_fetcher: BlockFetcher) -> list:
+    """
+    Same as create_liquidation_list, but search, block download and checks overlap through
+    stream_liquidations. Only the fields the stats, graph and export read are kept from each liquidation
+    :param liquidator: str contaiining the liquidator's address
+    :param config: dict from settings
+    :param block_fetcher: block fetcher from open_run
+    :return: liquidation list that has been checked for backrunning and frontrunning
+    """
+    liquidation_list = []
 
-    plt.bar(x_axis - 0.2, backrun, 0.4, label="backrun")
-    plt.bar(x_axis + 0.2, normal, 0.4, label="normal")
-    plt.xticks(x_axis[::10], labels[::10], rotation=90)
+    for liquidation in stream_liquidations(
+        liquidator, config["first_liq_block"], config["last_liq_block"], config["search_shards"], block_fetcher
+    ):
+        liquidation_list.append(flatten_liquidation(liquidation))
 
-    plt.legend()
-    plt.tight_layout()
-    plt.savefig(liquidator + ".png", format="png", dpi=600)
-    plt.close()
+    return liquidation_list
 
 
-def graph_txs(liquidation_list: list, liquidator: str) -> None:
+def export_liquidations(liquidation_list: list) -> None:
     """
-    Calls generate_graph and plot_graph
-    :param liquidation_list: list
-    :param liquidator: string
+    Writes the liquidations of every liquidator to export_path as columns, see export.read_columns
+    :param liquidation_list: list of liquidation dicts, full or flattened
     """
-    graph_dict = generate_graph_data(liquidation_list)
-    plot_graph(graph_dict, liquidator)
+    if not export_path:
+        return
+
+    with metrics.timer("export"):
+        rows = write_columns(liquidation_list, export_path)
+    print("")
+    print("Exported " + str(rows) + " liquidations to " + export_path)
 
 
-def check_prev_block_backrun(height: int, liquidator: str, s: Session) -> bool:
+def settings() -> dict:
     """
-    This method is called if the liquidation tx is the first tx on the block,
-    so we check the previous block in reverse order for the price_feed tx
-    :param height: height of the next block
-    :param liquidator: str containing liquidator's address
-    :param s: session
-    :return: returns true if price_feed tx found right before the liqiuidate tx,
-             false in all other cases
+    :return: settings of the run, read from this module so changes made after import carry over
     """
-    block = get_block(height - 1, s)
+    return {
+        "urls": urls,
+        "request_rate": request_rate,
+        "fetch_workers": fetch_workers,
+        "cache_bytes": cache_bytes,
+        "cache_compress": cache_compress,
+        "search_shards": search_shards,
+        "checkpoint_interval": checkpoint_interval,
+        "use_oracle_index": use_oracle_index,
+        "streaming": streaming,
+        "first_liq_block": first_liq_block,
+        "last_liq_block": last_liq_block,
+        "chart_dpi": chart_dpi,
+        "chart_format": chart_format,
+        "chart_panels": chart_panels,
+    }
 
-    if block is None:
-        return False
 
-    for tx in reversed(block):  # reverse block
-        if check_tx_type(tx, "execute_contract"):
-            if check_sender(tx, liquidator):  # if liquidator then check the next reverse tx
-                continue
-            elif check_sender(tx, oracle_feeder):  # if price_feed then return true
-                return True
-            else:  # otherwise return false
-                return False
-        else:  # if tx isn't a execute_contract, then it can't be a liq tx or price_feed tx, return false
-            return False
+def open_run(config: dict, share: int = 1) -> tuple:
+    """
+    Opens the objects a run works with. main opens them from this module's settings, every worker
+    process its own from the parent's, with the request rate, requests in flight and cache budget
+    split between the workers. Blocks are shared through blocks.db, not kept by every worker
+    :param config: dict from settings
+    :param share: processes the run is split between
+    :return: tuple of block fetcher and checkpoints
+    """
+    block_fetcher = open_fetcher(
+        config["urls"],
+        config["request_rate"] / share,
+        max(1, config["fetch_workers"] // share),
+        config["cache_bytes"] // share,
+        config["cache_compress"],
+        config["use_oracle_index"],
+    )
+    checkpoints = Checkpoints()  # checked liquidations saved to disk, later runs only check new blocks
 
-    return False  # if prev block is finished without finding the price_feed or returning false, assume the tx wasn't backrun
+    return block_fetcher, checkpoints
 
 
-def check_backrun(liquidation_list: list, liquidator: str, s: Session) -> list:
+def init_worker(config: dict, share: int) -> None:
+    """
+    Runs once in every worker process
+    :param config: dict from settings
+    :param share: worker processes
     """
-    This method checks if the liq tx from the liquidator backruns the price_feed tx from
-    the oracle feeder by getting the block, finding the liquidation tx, and checking the
-    tx prior to it. If the liq tx is index 0 of the block, we check the prior block for the
-    price_feed tx.
+    global worker
+    chart_renderer = ChartRenderer(config["chart_dpi"], config["chart_format"])  # one figure reused for every graph
+    worker = (config, *open_run(config, share), chart_renderer)
 
-    Given [some_tx, price_feed, liq_tx 1, ... liq_tx n], all liq_tx are considered backrun
-    Given [some_tx, price_feed, some_tx, liq_tx 1, ... liq_tx n], all liq_txs are considered not backrun
 
-    :param liquidation_list: list of liquidate_collateral from liquidator
+def process_liquidator(liquidator: str) -> tuple:
+    """
+    Runs in a worker process, checks liquidator and saves its graph. The parent prints every
+    liquidator's stats in order. With chart_panels the parent draws the graphs of every liquidator
+    together instead
     :param liquidator: str containing liquidator's address
-    :param s: session
-    :return: liquidation list with backrun information
+    :return: tuple of graph dict, the checked liquidations, flattened, and the worker's metrics
     """
-    for liquidation in liquidation_list:
-        liq_height = liquidation["height"]
-
-        block = get_block(liq_height, s)
-
-        for i in range(len(block)):  # iterate the block
-            if check_tx_type(block[i], "execute_contract"):
-                if check_sender(block[i], liquidator):  # find the liquidator's tx
-                    msg_list = get_msg_list(block[i])
-                    for msg in msg_list:
-                        if "liquidate_collateral" in msg:  # make sure its a liq tx
-                            if i > 0:
-                                if check_tx_type(block[i - 1], "execute_contract"):
-                                    if check_sender(block[i - 1], oracle_feeder):  # if prior tx is from oracle feeder
-                                        liquidation["backrun"] = True
-                                        break
-                            else:
-                                liquidation["backrun"] = check_prev_block_backrun(liq_height, liquidator, s)
+    config, block_fetcher, checkpoints, chart_renderer = worker
+    metrics.reset()  # only this liquidator's metrics go back to the parent
 
-    return liquidation_list
+    with metrics.timer("liquidator " + liquidator):
+        if config["streaming"]:
+            liquidation_list = stream_liquidation_list(liquidator, config, block_fetcher)
+        else:  # searches and blocks are already in blocks.db
+            liquidation_list = create_liquidation_list(liquidator, config, block_fetcher, checkpoints)
 
+        graph_dict = generate_graph_data(liquidation_list, config["first_liq_block"], config["last_liq_block"])
+        if not config["chart_panels"]:
+            with metrics.timer("plot graph"):
+                plot_graph(graph_dict, liquidator, chart_renderer)
 
-def get_liq_txs(sender: str, after_height: int, before_height: int, s: Session) -> list:
+    liquidation_list = [flatten_liquidation(liquidation) for liquidation in liquidation_list]
+    return graph_dict, liquidation_list, metrics.to_dict()
+
+
+def run_processes(config: dict, block_fetcher: BlockFetcher, checkpoints: Checkpoints) -> None:
     """
-    This method gets all liquidate_collateral transations for a given address between after_height and
-    before_height using figment.io transaction search
-    :param sender: string of sender's address
-    :param after_height: int
-    :param before_height: int
-    :param s: session
-    :return: list of dicts containing liquidation txs
+    Downloads the searches and blocks of every liquidator here first, planned across all of
+    them so no block is downloaded twice, then hands every liquidator to a pool of worker
+    processes that check them from blocks.db. Results are printed in the order of the
+    liquidators list, however the workers finish. Streaming workers download their own blocks
+    :param config: dict from settings
+    :param block_fetcher: block fetcher from open_run
+    :param checkpoints: checkpoints from open_run
     """
-    liq_list = []
-    offset = 0
-
-    while True:
-        tx_list = get_txs(sender, after_height, before_height, offset, s)
-
-        if not tx_list:
-            break
-
-        for tx in tx_list:  # iterate tx_list and find all liq txs from liquidator
-            if check_tx_type(tx, "execute_contract"):
-                msg_list = get_msg_list(tx)
-                for msg in msg_list:
-                    if "liquidate_collateral" in msg:
-                        liq_tx = {  # save relevant data to dict
-                            "hash": tx["hash"],
-                            "height": tx["height"],
-                            "execute_message": msg,
-                            "sender": get_sender(tx),
-                            "backrun": False,
-                        }
-                        liq_list.append(liq_tx)  # append dict to list
-        offset += 100  # change offset to get next 100 txs
-
-    return liq_list
-
-
-def create_liquidation_list(liquidator: str) -> list:
+    if not streaming:
+        plan = update_checkpoints(
+            liquidators,
+            first_liq_block,
+            last_liq_block,
+            checkpoint_interval,
+            search_shards,
+            block_fetcher,
+            checkpoints,
+            check=False,
+        )
+        print_fetch_plan(plan)
+    elif use_oracle_index:  # searched once here, the workers read it from blocks.db
+        block_fetcher.oracle_index.cover(first_liq_block - 1, last_liq_block + 1, search_shards, block_fetcher)
+
+    context = multiprocessing.get_context("spawn")  # forked workers would share this process' sqlite connections
+    with ProcessPoolExecutor(
+        max_workers=processes, mp_context=context, initializer=init_worker, initargs=(config, processes)
+    ) as pool:
+        results = list(pool.map(process_liquidator, liquidators))
+
+    graphs = {}
+    exported = []
+    for liquidator, (graph_dict, liquidation_list, summary) in zip(liquidators, results):
+        graphs[liquidator] = graph_dict
+        liquidator_stats(liquidation_list, liquidator)
+        if export_path:
+            exported.extend(liquidation_list)
+        metrics.merge(summary)
+
+    if chart_panels:
+        graph_all(graphs)
+
+    export_liquidations(exported)
+    report(metrics_path)
+
+
+def check_liquidators(config: dict, block_fetcher: BlockFetcher, checkpoints: Checkpoints) -> None:
     """
-    This method calls get_liq_txs to generate the liquidation tx list from liquidator, then
-    send the liquidation list to check_backrun
-    :param liquidator: str contaiining the liquidator's address
-    :param s: session
-    :return: liquidation list that has been checked for backrunning
+    Checks every liquidator in this process and prints the report
+    :param config: dict from settings
+    :param block_fetcher: block fetcher from open_run
+    :param checkpoints: checkpoints from open_run
     """
-    with Session() as s:
-        liquidation_list = get_liq_txs(liquidator, first_liq_block, last_liq_block, s)
-        liquidation_list = check_backrun(liquidation_list, liquidator, s)
+    graphs = {}
+    exported = []
+
+    if streaming:
+        for liquidator in liquidators:
+            with metrics.timer("liquidator " + liquidator):
+                liquidation_list = stream_liquidation_list(liquidator, config, block_fetcher)
+                graphs[liquidator] = generate_graph_data(liquidation_list, first_liq_block, last_liq_block)
+                liquidator_stats(liquidation_list, liquidator)
+            if export_path:
+                exported.extend(liquidation_list)
+        graph_all(graphs)
+        export_liquidations(exported)
+        report(metrics_path)
+        return
+
+    plan = update_checkpoints(  # only blocks after each liquidator's last checkpoint are searched and checked
+        liquidators, first_liq_block, last_liq_block, checkpoint_interval, search_shards, block_fetcher, checkpoints
+    )
+    print_fetch_plan(plan)
 
-    return liquidation_list
+    for liquidator in liquidators:
+        with metrics.timer("liquidator " + liquidator):
+            liquidation_list = checkpoints.load(liquidator, first_liq_block, last_liq_block)
+            graphs[liquidator] = generate_graph_data(liquidation_list, first_liq_block, last_liq_block)
+            liquidator_stats(liquidation_list, liquidator)
+        if export_path:
+            exported.extend(liquidation_list)
+
+    graph_all(graphs)
+    export_liquidations(exported)
+    report(metrics_path)
 
 
 def main():
     """ """
-    liquidators = [
-        "terra18kgwjqrm7mcnlzcy7l8h7awnn7fs2pvdl2tpm9",
-        "terra13wg8aj26kvzu2q0xwthkttwul4ud72t6y6z92r",
-        "terra1dx8p5gkegpcamny5emt0z069cm6ekjuwxhqgdg",
-        "terra1gcvztv0gmzqgyy0ae7v7v3rt0ggzktup9qzdnv",
-        "terra14s9r9u67tjy5yk7v6m6056qsh2jg2lpzhmzvg5",
-        "terra1v9l5hz9euqzm0hg4quh2gs32n9y99q9c4yhqqs",
-        "terra1t58pt7mgj30cgm682zn3s4rykvxa9p7t0jl0xm",
-        "terra1c0zj6xp7uzgctf2lqhthkdty828m29zyjdawd0",
-        "terra1swt4gfylaq02tsek3gunevyuwp2egtukhwrs4q",
-        "terra14l56n89zmf4km5m3xj7tq7p9f2w7zq6v2ly0xq",
-    ]
+    config = settings()
+    block_fetcher, checkpoints = open_run(config)
 
-    for liquidator in liquidators:
-        liquidation_list = create_liquidation_list(liquidator)
-        graph_txs(liquidation_list, liquidator)
-        liquidator_stats(liquidation_list, liquidator)
+    try:
+        if processes:
+            run_processes(config, block_fetcher, checkpoints)
+        else:
+            check_liquidators(config, block_fetcher, checkpoints)
+    finally:
+        block_fetcher.close()
+        checkpoints.close()
 
 
 if __name__ == "__main__":
-    if apikey == "":
+    if "" in apikeys:
         print("figment.io apikey missing")
         quit()
 
-    main()
+    with profiling(profile_cpu, profile_memory):
+        main()
@@ -0,0 +1,93 @@
+from block_store import BlockStore
+from compact_block import project_tx
+from fetcher import BlockFetcher
+from instrumentation import metrics
+
+
+class OracleIndex:
+    """
+    Heights where a feeder sent an execute_contract tx, found with the sender filtered
+    transaction search instead of downloading blocks. A liquidation can only be backrun or
+    frontrun if its block or a neighbouring block has a feed, so every other liquidation is
+    classified without fetching a block. Covered height ranges and feed heights are saved in
+    block_store, later runs only search the heights they haven't covered yet
+    """
+
+    def __init__(self, feeder: str, block_store: BlockStore):
+        """
+        :param feeder: str containing the feeder's address
+        :param block_store: persistent store the index is saved in
+        """
+        self.feeder = feeder
+        self.block_store = block_store
+        self.ranges = block_store.get_feed_ranges(feeder)  # list of (first_height, last_height), inclusive
+        self.heights = block_store.get_feed_heights(feeder)
+
+    def covers(self, height: int) -> bool:
+        for first_height, last_height in self.ranges:
+            if first_height <= height <= last_height:
+                return True
+
+        return False
+
+    def may_feed(self, height: int) -> bool:
+        """
+        :param height: int of block
+        :return: false only if the block is covered and has no execute_contract tx from the feeder
+        """
+        return height in self.heights or not self.covers(height)
+
+    def gaps(self, first_height: int, last_height: int) -> list:
+        """
+        :param first_height: first height wanted
+        :param last_height: last height wanted, inclusive
+        :return: list of (first_height, last_height) ranges not covered yet, inclusive
+        """
+        gaps = []
+        start = first_height
+
+        for covered_first, covered_last in sorted(self.ranges):
+            if covered_last < start:
+                continue
+            if covered_first > last_height:
+                break
+            if covered_first > start:
+                gaps.append((start, covered_first - 1))
+            start = max(start, covered_last + 1)
+
+        if start <= last_height:
+            gaps.append((start, last_height))
+
+        return gaps
+
+    def cover(self, first_height: int, last_height: int, shards: int, fetcher: BlockFetcher) -> int:
+        """
+        Searches the feeder's txs in every part of the range that isn't covered yet. The search
+        is widened by a block on each side and filtered, like checkpoint chunks, so it's right
+        whether figment's bounds are inclusive or not. Heights past the fetcher's final height are
+        left uncovered, their feeds may not be indexed yet, so may_feed stays true for them
+        :param first_height: first height to cover
+        :param last_height: last height to cover, inclusive
+        :param shards: number of height ranges searched at the same time
+        :param fetcher: block fetcher used for the search
+        :return: number of feed heights found
+        """
+        found = 0
+        if not fetcher.is_final(last_height + 1):  # the search reaches a block past last_height
+            last_height = fetcher.final_height() - 1
+
+        for gap_first, gap_last in self.gaps(first_height, last_height):
+            heights = set()
+            with metrics.timer("oracle index search"):
+                for tx in fetcher.iter_txs(self.feeder, gap_first - 1, gap_last + 1, shards):
+                    compact_tx = project_tx(tx)  # count only the txs check_block sees as feeds
+                    if compact_tx.kind == "execute_contract" and compact_tx.sender == self.feeder:
+                        if gap_first <= tx["height"] <= gap_last:
+                            heights.add(tx["height"])
+
+            self.block_store.put_feeds(self.feeder, gap_first, gap_last, heights)
+            self.ranges.append((gap_first, gap_last))
+            self.heights.update(heights)
+            found += len(heights)
+
+        return found
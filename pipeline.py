@@ -0,0 +1,87 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from queue import Empty, Queue
+
+from analysis import check_block, iter_liq_txs, load_blocks
+from fetcher import BlockFetcher, put_until
+from instrumentation import metrics
+
+done = object()  # marks the end of a stage's output
+
+
+def stream_liquidations(
+    liquidator: str, after_height: int, before_height: int, shards: int, fetcher: BlockFetcher, queue_size: int = 256
+):
+    """
+    Searches, downloads and checks the liquidations of liquidator at the same time. A search
+    thread feeds liquidations into a bounded queue as search pages arrive, a load thread starts
+    downloading each liquidation's blocks on a pool, and the caller checks liquidations in the
+    order they were found as their blocks finish. Memory is bounded by queue_size and the block
+    cache, not by the length of the history
+    :param liquidator: str containing liquidator's address
+    :param after_height: int
+    :param before_height: int
+    :param shards: number of height ranges searched at the same time
+    :param fetcher: block fetcher
+    :param queue_size: liquidations buffered between each stage
+    :return: generator of liquidation dicts with backrun and frontrun information
+    """
+    if fetcher.oracle_index is not None:  # feeds around every liquidation block, searched before any block is read
+        fetcher.oracle_index.cover(after_height - 1, before_height + 1, shards, fetcher)
+
+    liquidations = Queue(queue_size)  # liquidations waiting for their blocks to be requested
+    loading = Queue(queue_size)  # (liquidation, future) waiting for their blocks to be downloaded
+    stop = threading.Event()
+    loaders = ThreadPoolExecutor(max_workers=fetcher.workers)
+
+    def search() -> None:
+        try:
+            for liquidation in iter_liq_txs(liquidator, after_height, before_height, shards, fetcher):
+                if stop.is_set():
+                    break
+                put_until(liquidations, liquidation, stop)
+        except Exception as e:  # hand the error to the caller
+            put_until(liquidations, e, stop)
+        finally:
+            put_until(liquidations, done, stop)
+
+    def load() -> None:
+        while not stop.is_set():
+            try:
+                liquidation = liquidations.get(timeout=1)
+            except Empty:  # check stop again, the search thread gives up putting done once it's set
+                continue
+
+            if liquidation is done or isinstance(liquidation, Exception):
+                put_until(loading, (liquidation, None), stop)
+                return
+
+            future = loaders.submit(load_blocks, liquidation["height"], liquidator, fetcher)
+            put_until(loading, (liquidation, future), stop)
+
+    threading.Thread(target=search, daemon=True).start()
+    threading.Thread(target=load, daemon=True).start()
+
+    checked_height = None  # liquidations at the same height arrive together, check the block once
+    checked = None
+
+    try:
+        while True:
+            liquidation, future = loading.get()
+
+            if liquidation is done:
+                break
+            if isinstance(liquidation, Exception):
+                raise liquidation
+
+            future.result()
+            if liquidation["height"] != checked_height:
+                checked_height = liquidation["height"]
+                with metrics.timer("check block"):
+                    checked = check_block(checked_height, liquidator, fetcher)
+
+            liquidation["backrun"], liquidation["frontrun"] = checked
+            yield liquidation
+    finally:
+        stop.set()
+        loaders.shutdown(wait=False, cancel_futures=True)
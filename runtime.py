@@ -0,0 +1,37 @@
+from block_cache import BlockCache
+from block_store import BlockStore
+from compact_block import oracle_feeder
+from fetcher import BlockFetcher
+from oracle_index import OracleIndex
+from scheduler import RequestScheduler
+
+
+def open_fetcher(
+    urls: list,
+    request_rate: float,
+    fetch_workers: int,
+    cache_bytes: int,
+    cache_compress: bool = False,
+    use_oracle_index: bool = False,
+    final_lag: int = 1,
+) -> BlockFetcher:
+    """
+    Opens a block fetcher the way every script sets one up, with its own scheduler, cache and
+    blocks.db connection. Scripts call it from main, and worker processes from their initializer
+    :param urls: transaction search url of every api key
+    :param request_rate: requests per second allowed per api key, 0 for no limit
+    :param fetch_workers: most requests in flight at once
+    :param cache_bytes: memory budget for cached blocks
+    :param cache_compress: keep cached blocks compressed
+    :param use_oracle_index: load the oracle feeder's index from blocks.db, checks skip blocks with no feed nearby
+    :param final_lag: blocks behind the newest indexed height that may still be missing txs
+    :return: block fetcher, close it when done
+    """
+    block_cache = BlockCache(cache_bytes, cache_compress)
+    block_store = BlockStore()  # blocks and tx searches saved to disk and shared between runs
+    scheduler = RequestScheduler(urls, request_rate, fetch_workers)  # rate limits, retries and adaptive concurrency
+    block_fetcher = BlockFetcher(scheduler, block_cache, block_store, final_lag)
+    if use_oracle_index:
+        block_fetcher.oracle_index = OracleIndex(oracle_feeder, block_store)  # price_feed heights, saved in blocks.db
+
+    return block_fetcher
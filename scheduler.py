@@ -0,0 +1,277 @@
+import json
+import random
+import threading
+import time
+
+from requests import RequestException, Session
+from requests.adapters import HTTPAdapter
+
+from ingest import chunk_size, read_txs
+from instrumentation import metrics
+
+headers = {"content-type": "application/json"}
+
+
+class RequestError(Exception):
+    """
+    Raised when figment keeps failing a request after every retry, or answers
+    with an error that retrying won't fix
+    """
+
+
+class TokenBucket:
+    """
+    Requests per second limit of one api key, holding up to one second of requests and never
+    less than one, so rates below one request per second still send a request every 1 / rate seconds
+    """
+
+    def __init__(self, rate: float):
+        """
+        :param rate: requests per second, 0 for no limit
+        """
+        self.rate = rate
+        self.capacity = max(1.0, rate)
+        self.tokens = self.capacity
+        self.refilled = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """
+        Takes a token if one is available
+        :return: 0 if a token was taken, otherwise seconds until one is available
+        """
+        with self.lock:
+            now = time.monotonic()
+            if now < self.paused_until:
+                return self.paused_until - now
+
+            if not self.rate:
+                return 0.0
+
+            self.tokens = min(self.capacity, self.tokens + (now - self.refilled) * self.rate)
+            self.refilled = now
+
+            if self.tokens < 1:
+                return (1 - self.tokens) / self.rate
+
+            self.tokens -= 1
+            return 0.0
+
+    def pause(self, seconds: float) -> None:
+        """
+        Stops handing out tokens for seconds, used when figment throttles the key
+        :param seconds: float
+        """
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+            self.tokens = 0.0
+
+
+class AdaptiveLimit:
+    """
+    AIMD limit on requests in flight. The limit starts low and grows by one per response
+    until the first sign of congestion, then by one per round trip. It halves when a request
+    fails or is throttled and shrinks by a tenth when the smoothed latency goes over tolerance
+    times the lowest seen, at most once per round trip
+    """
+
+    def __init__(self, minimum: int, maximum: int, tolerance: float = 3.0):
+        """
+        :param minimum: lowest limit
+        :param maximum: highest limit
+        :param tolerance: smoothed latency over this multiple of the baseline counts as congestion
+        """
+        self.minimum = minimum
+        self.maximum = maximum
+        self.tolerance = tolerance
+        self.limit = float(minimum)
+        self.threshold = float(maximum)  # grow fast below this, it drops to half the limit on congestion
+        self.in_flight = 0
+        self.latency = None  # moving average of recent latencies
+        self.baseline = None  # lowest average latency, drifts up slowly so it follows the network
+        self.decreased = 0.0
+        self.cond = threading.Condition()
+
+    def acquire(self) -> None:
+        with self.cond:
+            while self.in_flight >= int(self.limit):
+                self.cond.wait()
+            self.in_flight += 1
+
+    def release(self, latency: float, ok: bool) -> None:
+        """
+        :param latency: seconds the request took
+        :param ok: false if the request failed or was throttled
+        """
+        with self.cond:
+            self.in_flight -= 1
+
+            if ok:
+                self.latency = latency if self.latency is None else self.latency + (latency - self.latency) * 0.1
+                if self.baseline is None or self.latency < self.baseline:
+                    self.baseline = self.latency
+                else:
+                    self.baseline += (self.latency - self.baseline) * 0.001
+
+            if not ok:
+                self.decrease(0.5, latency)
+            elif self.latency > self.tolerance * self.baseline:
+                self.decrease(0.9, latency)
+            elif self.limit < self.threshold:
+                self.limit = min(self.maximum, self.limit + 1)
+            else:
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+
+            self.cond.notify_all()
+
+    def decrease(self, factor: float, latency: float) -> None:
+        """
+        :param factor: multiplied into the limit
+        :param latency: seconds the request took, the limit isn't lowered again within it
+        """
+        now = time.monotonic()
+        if now - self.decreased > latency:  # one decrease per round trip, not one per request in it
+            self.limit = max(self.minimum, self.limit * factor)
+            self.threshold = max(self.minimum, self.limit)
+            self.decreased = now
+
+
+class RequestScheduler:
+    """
+    Sends every figment request. Requests are spread round robin over the api keys, each
+    limited by its own token bucket, requests in flight are limited by an AIMD limit, and
+    throttled, failed or malformed responses are retried with exponential backoff and jitter
+    """
+
+    def __init__(
+        self,
+        urls: list,
+        rate: float = 0.0,
+        max_concurrency: int = 16,
+        min_concurrency: int = 1,
+        retries: int = 8,
+        backoff: float = 0.5,
+        max_backoff: float = 30.0,
+        timeout: float = 60.0,
+    ):
+        """
+        :param urls: transaction search url of every api key
+        :param rate: requests per second allowed per api key, 0 for no limit
+        :param max_concurrency: most requests in flight at once
+        :param min_concurrency: fewest requests in flight the limit backs off to
+        :param retries: times a request is retried before giving up
+        :param backoff: seconds waited before the first retry, doubled on every retry after
+        :param max_backoff: longest wait between retries
+        :param timeout: seconds to wait for a response
+        """
+        self.urls = urls
+        self.buckets = [TokenBucket(rate) for _ in urls]
+        self.next_key = 0
+        self.lock = threading.Lock()
+        self.limit = AdaptiveLimit(min_concurrency, max_concurrency)
+        self.max_concurrency = max_concurrency
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+
+        self.session = Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_concurrency)  # one keep-alive connection per request
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def take_key(self) -> int:
+        """
+        Waits until one of the api keys has a token, starting from the key after the last one used
+        :return: index of the api key
+        """
+        with self.lock:
+            start = self.next_key
+            self.next_key = (self.next_key + 1) % len(self.urls)
+
+        while True:
+            waits = []
+            for i in range(len(self.urls)):
+                key = (start + i) % len(self.urls)
+                wait = self.buckets[key].reserve()
+                if not wait:
+                    return key
+                waits.append(wait)
+
+            metrics.count("rate limit waits")
+            time.sleep(min(waits))
+
+    def post(self, data: dict) -> list:
+        """
+        :param data: transaction search request data
+        :return: list of txs
+        """
+        body = json.dumps(data)
+
+        for attempt in range(self.retries + 1):
+            key = self.take_key()
+            self.limit.acquire()
+            start = time.perf_counter()
+
+            try:
+                res = self.session.post(self.urls[key], data=body, headers=headers, timeout=self.timeout, stream=True)
+                if res.status_code == 200:
+                    with metrics.timer("stream parse"):
+                        tx_list = read_txs(counted(res.iter_content(chunk_size)))  # parsed as the body arrives
+                else:
+                    content = res.content
+            except RequestException as e:
+                res, error = None, e
+            except ValueError as e:  # the body isn't a json list of txs, or it broke off
+                tx_list, error = None, "malformed response, " + str(e)
+                res.close()  # the rest of the body isn't read, don't reuse the connection
+
+            latency = time.perf_counter() - start
+            ok = res is not None and res.status_code == 200
+            self.limit.release(latency, ok)
+
+            if ok and tx_list is not None:
+                return tx_list
+            elif res is not None and not ok:
+                error = "status " + str(res.status_code) + " " + repr(content[:200])
+                if res.status_code != 429 and res.status_code < 500:  # retrying a bad request won't help
+                    raise RequestError(error)
+
+            delay = min(self.max_backoff, self.backoff * 2**attempt) * random.uniform(0.5, 1.0)
+            if res is not None and res.status_code == 429:
+                delay = max(delay, retry_after(res))
+                self.buckets[key].pause(delay)  # other keys keep going while this one cools down
+                metrics.count("throttled")
+            else:
+                metrics.count("request errors")
+
+            if attempt < self.retries:
+                metrics.count("retries")
+                time.sleep(delay)
+
+        raise RequestError("gave up after " + str(self.retries) + " retries, last error: " + str(error))
+
+    def close(self) -> None:
+        self.session.close()
+
+
+def counted(chunks):
+    """
+    :param chunks: iterable of response bytes
+    :return: generator of the same chunks, counted in bytes downloaded
+    """
+    for chunk in chunks:
+        metrics.count("bytes downloaded", len(chunk))
+        yield chunk
+
+
+def retry_after(res) -> float:
+    """
+    :param res: throttled response
+    :return: seconds figment asks to wait, 0 if it doesn't say
+    """
+    try:
+        return float(res.headers.get("Retry-After", 0))
+    except ValueError:
+        return 0.0
@@ -0,0 +1,70 @@
+import numpy as np
+
+
+class LiquidationStats:
+    """
+    Liquidation heights and backrun/frontrun flags as height sorted numpy arrays with prefix sums,
+    so the totals of any height window are two binary searches and a subtraction. Every method
+    takes arrays of windows or split heights and answers all of them at once
+    """
+
+    def __init__(self, liquidation_list: list):
+        """
+        :param liquidation_list: list of liquidation dicts with height, backrun and frontrun
+        """
+        heights = np.fromiter((liquidation["height"] for liquidation in liquidation_list), np.int64)
+        backrun = np.fromiter((liquidation.get("backrun", False) for liquidation in liquidation_list), bool)
+        frontrun = np.fromiter((liquidation.get("frontrun", False) for liquidation in liquidation_list), bool)
+        order = np.argsort(heights, kind="stable")
+
+        self.heights = heights[order]
+        self.backrun = backrun[order]
+        self.frontrun = frontrun[order]
+        self.backrun_sum = np.concatenate(([0], np.cumsum(self.backrun)))  # backrun_sum[i] = backruns in heights[:i]
+        self.frontrun_sum = np.concatenate(([0], np.cumsum(self.frontrun)))
+
+    def __len__(self) -> int:
+        return len(self.heights)
+
+    def windows(self, starts, ends) -> tuple:
+        """
+        Totals of liquidations with start <= height < end for every start, end pair
+        :param starts: int or array of window starts
+        :param ends: int or array of window ends
+        :return: tuple of total, backrun and frontrun arrays
+        """
+        lo = np.searchsorted(self.heights, starts, side="left")
+        hi = np.searchsorted(self.heights, ends, side="left")
+        return hi - lo, self.backrun_sum[hi] - self.backrun_sum[lo], self.frontrun_sum[hi] - self.frontrun_sum[lo]
+
+    def splits(self, split_heights, start: int, end: int) -> tuple:
+        """
+        Totals before and after every split height in start <= height < end,
+        e.g. for sweeping hundreds of candidate split heights at once
+        :param split_heights: int or array of split heights
+        :param start: start of the height range
+        :param end: end of the height range
+        :return: tuple of (total, backrun, frontrun) before and (total, backrun, frontrun) after
+        """
+        split_heights = np.asarray(split_heights)
+        before = self.windows(np.full_like(split_heights, start), split_heights)
+        after = self.windows(split_heights, np.full_like(split_heights, end))
+        return before, after
+
+    def histogram(self, start: int, end: int, interval: int) -> tuple:
+        """
+        Counts liquidations in buckets of interval blocks, one bucket for every interval
+        from start up to end, the last bucket is a full interval even if it runs past end
+        :param start: height of the first bucket
+        :param end: end of the height range
+        :param interval: blocks per bucket
+        :return: tuple of bucket start heights, backrun counts and not backrun counts
+        """
+        bucket_starts = np.arange(start, end, interval)
+        lo = np.searchsorted(self.heights, start, side="left")
+        hi = np.searchsorted(self.heights, start + len(bucket_starts) * interval, side="left")
+
+        buckets = (self.heights[lo:hi] - start) // interval
+        total = np.bincount(buckets, minlength=len(bucket_starts))
+        backrun = np.bincount(buckets, weights=self.backrun[lo:hi], minlength=len(bucket_starts)).astype(np.int64)
+        return bucket_starts, backrun, total - backrun
@@ -0,0 +1,152 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from analysis import check_block, check_liq_tx
+from fetcher import BlockFetcher, shard_edges
+from instrumentation import metrics
+from runtime import open_fetcher
+
+fetcher = None  # BlockFetcher of a sweep worker process
+
+
+def sweep_heights(first_height: int, last_height: int, fetcher: BlockFetcher, window: int = 64) -> dict:
+    """
+    Reads every block from first_height to last_height, finds every liquidator with a liq tx in it
+    and checks the block for each of them, window blocks downloaded at a time. Only the block cache
+    holds blocks, so memory stays flat however long the range is
+    :param first_height: first height swept
+    :param last_height: last height swept, inclusive
+    :param fetcher: block fetcher
+    :param window: blocks downloaded in parallel before they are checked
+    :return: dict of liquidator -> [liquidation txs, backrun, frontrun]
+    """
+    counts = {}
+
+    for window_start in range(first_height, last_height + 1, window):
+        heights = range(window_start, min(window_start + window, last_height + 1))
+        fetcher.prefetch(heights)
+
+        for height in heights:
+            block = fetcher.get_block(height)
+            if not block:
+                continue
+
+            liq_txs = {}  # liquidator -> liq txs in the block
+            for tx in block:
+                if tx.sender is not None and check_liq_tx(tx, tx.sender):
+                    liq_txs[tx.sender] = liq_txs.get(tx.sender, 0) + 1
+
+            for liquidator, n in liq_txs.items():
+                with metrics.timer("check block"):
+                    backrun, frontrun = check_block(height, liquidator, fetcher)
+                liquidator_counts = counts.setdefault(liquidator, [0, 0, 0])
+                liquidator_counts[0] += n
+                liquidator_counts[1] += n if backrun else 0
+                liquidator_counts[2] += n if frontrun else 0
+
+    return counts
+
+
+def merge_counts(counts: dict, shard_counts: dict) -> None:
+    """
+    :param counts: dict of liquidator -> [liquidation txs, backrun, frontrun], updated in place
+    :param shard_counts: counts of one shard
+    """
+    for liquidator, shard_liquidator_counts in shard_counts.items():
+        liquidator_counts = counts.setdefault(liquidator, [0, 0, 0])
+        for i, n in enumerate(shard_liquidator_counts):
+            liquidator_counts[i] += n
+
+
+def init_worker(urls: list, request_rate: float, fetch_workers: int, cache_bytes: int) -> None:
+    """
+    Runs once in every sweep worker process
+    """
+    global fetcher
+    fetcher = open_fetcher(urls, request_rate, fetch_workers, cache_bytes)
+
+
+def sweep_shard(shard: tuple) -> tuple:
+    """
+    Runs in a sweep worker process. The cache is emptied after the shard, so no block outlives it
+    :param shard: tuple of first and last height, inclusive
+    :return: tuple of the shard's counts and metrics
+    """
+    metrics.reset()
+    first_height, last_height = shard
+    counts = sweep_heights(first_height, last_height, fetcher, 4 * fetcher.workers)
+    fetcher.block_cache.clear()
+    return counts, metrics.to_dict()
+
+
+def sweep(
+    first_height: int,
+    last_height: int,
+    urls: list,
+    request_rate: float = 0.0,
+    fetch_workers: int = 16,
+    cache_bytes: int = 64 * 1024 * 1024,
+    processes: int = 4,
+    shards: int = 64,
+):
+    """
+    Sweeps first_height to last_height split into height shards, each handed to one of processes
+    worker processes. The request rate and requests in flight are split between the workers, blocks
+    are shared with the other scripts through blocks.db
+    :param first_height: first height swept
+    :param last_height: last height swept, inclusive
+    :param urls: transaction search url of every api key
+    :param request_rate: requests per second allowed per api key, 0 for no limit
+    :param fetch_workers: most requests in flight over all workers
+    :param cache_bytes: memory budget for cached blocks of each worker
+    :param processes: worker processes, 0 sweeps in this process
+    :param shards: height ranges the sweep is split into
+    :return: generator of (shard, counts) as shards finish, counts is a dict of
+             liquidator -> [liquidation txs, backrun, frontrun]
+    """
+    edges = shard_edges(first_height - 1, last_height, shards)  # shard i is edges[i] + 1 to edges[i + 1]
+    shard_list = [(edges[i] + 1, edges[i + 1]) for i in range(len(edges) - 1)]
+
+    if not processes:
+        local = open_fetcher(urls, request_rate, fetch_workers, cache_bytes)
+        for shard in shard_list:
+            counts = sweep_heights(shard[0], shard[1], local, 4 * local.workers)
+            local.block_cache.clear()  # like sweep_shard, no block outlives its shard
+            yield shard, counts
+        local.close()
+        return
+
+    config = (urls, request_rate / processes, max(1, fetch_workers // processes), cache_bytes)
+    context = multiprocessing.get_context("spawn")  # forked workers would share this process' sqlite connections
+    with ProcessPoolExecutor(
+        max_workers=processes, mp_context=context, initializer=init_worker, initargs=config
+    ) as pool:
+        futures = {pool.submit(sweep_shard, shard): shard for shard in shard_list}
+        for future in as_completed(futures):
+            counts, summary = future.result()
+            metrics.merge(summary)
+            yield futures[future], counts
+
+
+def rank(counts: dict) -> list:
+    """
+    :param counts: dict of liquidator -> [liquidation txs, backrun, frontrun]
+    :return: list of (liquidator, liquidation txs, backrun, frontrun), most liquidation txs first
+    """
+    ranked = [(liquidator, *liquidator_counts) for liquidator, liquidator_counts in counts.items()]
+    ranked.sort(key=lambda row: (-row[1], row[0]))
+    return ranked
+
+
+def print_ranking(ranked: list) -> None:
+    """
+    :param ranked: list returned by rank
+    """
+    print("")
+    print("%-46s %10s %9s %9s %9s %9s" % ("liquidator", "liq txs", "backrun", "backrun%", "frontrun", "frontrun%"))
+
+    for liquidator, total, backrun, frontrun in ranked:
+        print(
+            "%-46s %10d %9d %8.1f%% %9d %8.1f%%"
+            % (liquidator, total, backrun, backrun / total * 100, frontrun, frontrun / total * 100)
+        )
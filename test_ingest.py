@@ -0,0 +1,60 @@
+import json
+import random
+
+import pytest
+
+from ingest import iter_array
+
+values = [0, -7, 6.5e3, 1.25, -0.5e-2, 12345678901234, True, False, None, "", "a,]b", 'q"\\u00e9[', [], [1, [2]], {}]
+
+
+def random_value(rand: random.Random, depth: int = 0):
+    if depth < 2 and rand.random() < 0.3:
+        return {"k%d" % i: random_value(rand, depth + 1) for i in range(rand.randint(0, 3))}
+    if depth < 2 and rand.random() < 0.2:
+        return [random_value(rand, depth + 1) for _ in range(rand.randint(0, 3))]
+    return rand.choice(values)
+
+
+def split(body: bytes, rand: random.Random) -> list:
+    """
+    :return: body cut at random points, some chunks empty or a single byte
+    """
+    cuts = sorted(rand.randint(0, len(body)) for _ in range(rand.randint(0, 12)))
+    return [body[start:end] for start, end in zip([0] + cuts, cuts + [len(body)])]
+
+
+def fixed_splits(body: bytes) -> list:
+    """
+    :return: body in chunks of every size from one byte to the whole body
+    """
+    return [[body[i : i + size] for i in range(0, len(body), size)] for size in range(1, len(body) + 1)]
+
+
+@pytest.mark.parametrize("seed", range(500))
+def test_random_split_arrays(seed):
+    rand = random.Random(seed)
+    array = [random_value(rand) for _ in range(rand.randint(0, 8))]
+    body = json.dumps(array, indent=rand.choice([None, 1]), ensure_ascii=rand.random() < 0.5).encode()
+
+    assert list(iter_array(split(body, rand))) == json.loads(body)
+
+
+@pytest.mark.parametrize("chunks", [[b"[6.", b"5e3, 7]"], [b"[6", b".5", b"e", b"3]"], [b"[-", b"1]"], [b"[1", b"2]"]])
+def test_number_split_at_chunk_end(chunks):
+    assert list(iter_array(chunks)) == json.loads(b"".join(chunks))
+
+
+@pytest.mark.parametrize("body", [b"null", b" null\n", b"[]", b" [ ] ", b"{}"])
+def test_empty_bodies(body):
+    for chunks in fixed_splits(body):
+        assert list(iter_array(chunks)) == []
+
+
+@pytest.mark.parametrize(
+    "body", [b"[1, 2", b"[1, 2,", b'[{"a": 1}', b'["abc', b"[1, 2] 3", b"[1 2]", b'{"a": 1}', b"7", b""]
+)
+def test_truncated_or_malformed_bodies(body):
+    for chunks in fixed_splits(body) or [[]]:
+        with pytest.raises(ValueError):
+            list(iter_array(chunks))
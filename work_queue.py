@@ -0,0 +1,220 @@
+import json
+import sqlite3
+import threading
+import time
+
+queue_path = "work.db"
+
+
+class WorkQueue:
+    """
+    Work units of a run saved in a sqlite file that workers on any number of hosts claim from,
+    e.g. on shared storage. A claimed unit is leased to its worker until lease_until, workers
+    renew the lease while they work and a unit whose lease ran out, because its worker crashed
+    or lost the file, is handed to the next worker that asks. A unit that failed or ran out its
+    lease max_attempts times is marked failed with its last error instead of being handed out
+    again. Claims take sqlite's write lock,
+    so two workers never hold the same unit. The file stays in rollback journal mode, WAL
+    doesn't work over network filesystems. Leases use each host's clock, keep them far longer
+    than the clocks drift
+    """
+
+    def __init__(self, path: str = queue_path):
+        """
+        :param path: path of the sqlite file
+        """
+        self.path = path
+        self.conn = sqlite3.connect(path, timeout=60, check_same_thread=False, isolation_level=None)
+        self.lock = threading.Lock()
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS units "
+            "(id INTEGER PRIMARY KEY AUTOINCREMENT, run TEXT, liquidator TEXT, after_height INTEGER, "
+            "before_height INTEGER, owner TEXT, lease_until REAL, attempts INTEGER DEFAULT 0, done INTEGER DEFAULT 0, "
+            "failed INTEGER DEFAULT 0, error TEXT, result TEXT, metrics TEXT, UNIQUE (run, liquidator, after_height))"
+        )
+
+    def add_units(self, run: str, units: list) -> int:
+        """
+        Adds the units of a run, units that are already queued are left as they are
+        :param run: name of the run
+        :param units: list of (liquidator, after_height, before_height)
+        :return: number of units added
+        """
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            before = self.conn.total_changes
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO units (run, liquidator, after_height, before_height) VALUES (?, ?, ?, ?)",
+                [(run, *unit) for unit in units],
+            )
+            added = self.conn.total_changes - before
+            self.conn.execute("COMMIT")
+
+        return added
+
+    def claim(self, run: str, owner: str, lease: float, max_attempts: int) -> tuple:
+        """
+        Leases the oldest unit that isn't done, failed or leased to a live worker. Units whose
+        lease ran out on their last attempt are marked failed first
+        :param run: name of the run
+        :param owner: id of the claiming worker
+        :param lease: seconds the unit is leased for
+        :param max_attempts: claims of a unit before it's marked failed
+        :return: tuple of unit id, liquidator, after_height and before_height, None if no unit is free
+        """
+        now = time.time()
+
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")  # no other worker can claim between the select and the update
+            try:
+                self.conn.execute(
+                    "UPDATE units SET failed = 1, error = COALESCE(error, 'lease ran out') WHERE run = ? AND done = 0 "
+                    "AND failed = 0 AND attempts >= ? AND lease_until < ?",
+                    (run, max_attempts, now),
+                )
+                row = self.conn.execute(
+                    "SELECT id, liquidator, after_height, before_height FROM units WHERE run = ? AND done = 0 "
+                    "AND failed = 0 AND (lease_until IS NULL OR lease_until < ?) ORDER BY id LIMIT 1",
+                    (run, now),
+                ).fetchone()
+
+                if row is not None:
+                    self.conn.execute(
+                        "UPDATE units SET owner = ?, lease_until = ?, attempts = attempts + 1 WHERE id = ?",
+                        (owner, now + lease, row[0]),
+                    )
+            finally:
+                self.conn.execute("COMMIT")
+
+        return row
+
+    def renew(self, unit_id: int, owner: str, lease: float) -> bool:
+        """
+        :param unit_id: id of a unit leased to owner
+        :param owner: id of the worker
+        :param lease: seconds from now the unit is leased for
+        :return: false if the unit is done or was leased to another worker after the lease ran out
+        """
+        with self.lock:
+            cursor = self.conn.execute(
+                "UPDATE units SET lease_until = ? WHERE id = ? AND owner = ? AND done = 0",
+                (time.time() + lease, unit_id, owner),
+            )
+
+        return cursor.rowcount > 0
+
+    def complete(self, unit_id: int, liquidation_list: list, summary: dict) -> bool:
+        """
+        Saves the result of a unit. The first worker to finish a unit wins, a worker whose
+        lease ran out while it was still working finishes with the same result anyway
+        :param unit_id: id of the unit
+        :param liquidation_list: checked liquidations of the unit
+        :param summary: metrics of the unit, from metrics.to_dict
+        :return: false if another worker already finished the unit
+        """
+        with self.lock:
+            cursor = self.conn.execute(
+                "UPDATE units SET done = 1, failed = 0, lease_until = NULL, result = ?, metrics = ? "
+                "WHERE id = ? AND done = 0",
+                (json.dumps(liquidation_list), json.dumps(summary), unit_id),
+            )
+
+        return cursor.rowcount > 0
+
+    def fail(self, unit_id: int, error: str, max_attempts: int) -> bool:
+        """
+        Records the error of a unit's attempt and frees it for another attempt, or marks it
+        failed once it has been claimed max_attempts times
+        :param unit_id: id of the unit
+        :param error: str describing the error
+        :param max_attempts: claims of a unit before it's marked failed
+        :return: true if the unit is marked failed
+        """
+        with self.lock:
+            self.conn.execute(
+                "UPDATE units SET lease_until = NULL, error = ?, failed = attempts >= ? WHERE id = ? AND done = 0",
+                (error, max_attempts, unit_id),
+            )
+            row = self.conn.execute("SELECT failed FROM units WHERE id = ?", (unit_id,)).fetchone()
+
+        return bool(row and row[0])
+
+    def reset_failed(self, run: str) -> int:
+        """
+        Gives the failed units of a run their attempts back, e.g. once the error is fixed
+        :param run: name of the run
+        :return: number of units reset
+        """
+        with self.lock:
+            cursor = self.conn.execute(
+                "UPDATE units SET failed = 0, attempts = 0, error = NULL, lease_until = NULL "
+                "WHERE run = ? AND failed = 1",
+                (run,),
+            )
+
+        return cursor.rowcount
+
+    def progress(self, run: str) -> dict:
+        """
+        :param run: name of the run
+        :return: dict of unit counts, total, done, failed, leased to a live worker and claimed more than once
+        """
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT COUNT(*), SUM(done), SUM(failed), SUM(done = 0 AND lease_until >= ?), SUM(attempts > 1) "
+                "FROM units WHERE run = ?",
+                (time.time(), run),
+            ).fetchone()
+
+        total, done, failed, leased, retried = [count or 0 for count in row]
+        return {"total": total, "done": done, "failed": failed, "leased": leased, "retried": retried}
+
+    def failures(self, run: str) -> list:
+        """
+        :param run: name of the run
+        :return: list of (liquidator, after_height, before_height, attempts, error) of every failed unit
+        """
+        with self.lock:
+            return self.conn.execute(
+                "SELECT liquidator, after_height, before_height, attempts, error FROM units "
+                "WHERE run = ? AND failed = 1 ORDER BY id",
+                (run,),
+            ).fetchall()
+
+    def liquidators(self, run: str) -> list:
+        """
+        :param run: name of the run
+        :return: liquidators of the run in the order they were added
+        """
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT liquidator FROM units WHERE run = ? GROUP BY liquidator ORDER BY MIN(id)", (run,)
+            ).fetchall()
+
+        return [row[0] for row in rows]
+
+    def results(self, run: str, liquidator: str) -> tuple:
+        """
+        :param run: name of the run
+        :param liquidator: str containing liquidator's address
+        :return: tuple of the checked liquidations of every finished unit of liquidator, newest
+                 first like get_liq_txs, and a list of their metrics
+        """
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT result, metrics FROM units WHERE run = ? AND liquidator = ? AND done = 1 "
+                "ORDER BY after_height DESC",
+                (run, liquidator),
+            ).fetchall()
+
+        liquidation_list = []
+        summaries = []
+        for result, summary in rows:
+            liquidation_list.extend(json.loads(result))
+            summaries.append(json.loads(summary))
+
+        return liquidation_list, summaries
+
+    def close(self) -> None:
+        with self.lock:
+            self.conn.close()